@@ -0,0 +1,56 @@
+"""
+Compare two load-test result files
+Prints latency and throughput changes per endpoint and concurrency level
+
+Run:
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+
+import argparse
+import json
+import sys
+
+
+def index_results(report):
+    return {(result["endpoint"], result["concurrency"]): result for result in report["results"]}
+
+
+def change(before, after):
+    if before in (None, 0) or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SaarthiAI load-test results")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline.get('build')}  vs  candidate {candidate.get('build')}")
+    print(f"{'endpoint':<14} {'conc':>4}  {'rps':>18}  {'p50 ms':>18}  {'p95 ms':>18}  {'p99 ms':>18}")
+
+    before_results = index_results(baseline)
+    for key, after in index_results(candidate).items():
+        before = before_results.get(key)
+        if before is None:
+            continue
+
+        columns = [f"{before['throughput_rps']}→{after['throughput_rps']} ({change(before['throughput_rps'], after['throughput_rps'])})"]
+        for quantile in ("p50", "p95", "p99"):
+            old = before["latency_ms"].get(quantile)
+            new = after["latency_ms"].get(quantile)
+            columns.append(f"{old}→{new} ({change(old, new)})")
+
+        print(f"{key[0]:<14} {key[1]:>4}  " + "  ".join(f"{column:>18}" for column in columns))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
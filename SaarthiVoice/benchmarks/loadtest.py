@@ -0,0 +1,302 @@
+"""
+End-to-end load test for SaarthiAI
+Drives /get-guidance, /respond and /transcribe at several concurrency levels
+against a server wired to local upstream stubs, and writes JSON results
+
+Run from the SaarthiVoice directory:
+    python -m benchmarks.loadtest --concurrency 1,8,32 --requests 200 \
+        --stt-latency-ms 300 --tts-latency-ms 400 --output results.json
+
+Compare two runs:
+    python -m benchmarks.compare baseline.json results.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.stub_upstreams import STT_PATH, TTS_PATH, percentiles
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+ENDPOINTS = ("get-guidance", "respond", "transcribe")
+
+# Mix of repeat and distinct questions across the three languages
+QUERIES = [
+    ("fever", "en"), ("I have a cold and cough", "en"), ("stomach pain", "en"),
+    ("how to apply for pension", "en"), ("heatwave safety", "en"), ("flood warning", "en"),
+    ("मेरे बच्चे को बुखार है", "hi"), ("योजना के लिए आवेदन", "hi"), ("बाढ़ आ गई", "hi"),
+    ("నా బిడ్డకు జ్వరం వచ్చింది", "te"), ("పథకం గురించి", "te"), ("hello", "te"),
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_recording(seconds=2.0, sample_rate=16000):
+    """Build a WAV upload (tone with a short silent lead-in) in memory"""
+    frames = bytearray()
+    for index in range(int(seconds * sample_rate)):
+        t = index / sample_rate
+        sample = 0 if t < 0.3 else int(6000 * math.sin(2 * math.pi * 220 * t))
+        frames += sample.to_bytes(2, "little", signed=True)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def parse_server_timing(header):
+    """Turn 'decode;dur=12.1, stt;dur=300' into {'decode': 12.1, 'stt': 300.0}"""
+    stages = {}
+    for metric in header.split(","):
+        parts = [part.strip() for part in metric.split(";")]
+        for part in parts[1:]:
+            if part.startswith("dur="):
+                try:
+                    stages[parts[0]] = float(part[4:])
+                except ValueError:
+                    pass
+    return stages
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def wait_until_up(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class Harness:
+    """Starts the upstream stubs and a SaarthiAI server wired to them"""
+
+    def __init__(self, args):
+        self.args = args
+        self.processes = []
+        self.stub_url = None
+        self.base_url = args.base_url
+
+    async def __aenter__(self):
+        if self.args.stub_url:
+            # Stubs already running (e.g. next to an existing --base-url server)
+            self.stub_url = self.args.stub_url.rstrip("/")
+        else:
+            await self._start_stubs()
+
+        if not self.base_url:
+            await self._start_server()
+
+        return self
+
+    async def _start_stubs(self):
+        stub_port = free_port()
+        self.stub_url = f"http://127.0.0.1:{stub_port}"
+        stub_command = [
+            sys.executable, "-m", "benchmarks.stub_upstreams", "--port", str(stub_port),
+            "--stt-latency-ms", str(self.args.stt_latency_ms),
+            "--stt-jitter-ms", str(self.args.stt_jitter_ms),
+            "--stt-error-rate", str(self.args.stt_error_rate),
+            "--tts-latency-ms", str(self.args.tts_latency_ms),
+            "--tts-jitter-ms", str(self.args.tts_jitter_ms),
+            "--tts-error-rate", str(self.args.tts_error_rate),
+        ]
+        self.processes.append(subprocess.Popen(stub_command, cwd=APP_DIR))
+        await wait_until_up(f"{self.stub_url}/_stub/config")
+
+    async def _start_server(self):
+        port = free_port()
+        self.base_url = f"http://127.0.0.1:{port}"
+        env = dict(
+            os.environ,
+            SAARTHI_GOOGLE_STT_URL=self.stub_url + STT_PATH,
+            SAARTHI_GTTS_URL=self.stub_url + TTS_PATH,
+            SAARTHI_TTS_CACHE_DIR=tempfile.mkdtemp(prefix="saarthi-bench-cache-"),
+            SAARTHI_AUDIO_STORE_DIR=tempfile.mkdtemp(prefix="saarthi-bench-store-"),
+        )
+        if not self.args.tts_cache:
+            env["SAARTHI_TTS_MEMORY_CACHE_MB"] = "0"
+            env["SAARTHI_TTS_DISK_CACHE_MB"] = "0"
+            env["SAARTHI_AUDIO_STORE_DIR"] = ""
+        server_command = [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(self.args.workers), "--log-level", "warning",
+        ]
+        self.processes.append(subprocess.Popen(server_command, cwd=APP_DIR, env=env))
+        await wait_until_up(f"{self.base_url}/health")
+
+    async def __aexit__(self, *exc):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    async def stub_stats(self, reset=False):
+        async with httpx.AsyncClient(base_url=self.stub_url) as client:
+            stats = (await client.get("/_stub/stats")).json()
+            if reset:
+                await client.post("/_stub/reset")
+            return stats
+
+
+async def run_level(client, endpoint, concurrency, total, recording):
+    """Send `total` requests to one endpoint with `concurrency` in flight"""
+    latencies = []
+    stages = {}
+    errors = {}
+    counter = iter(range(total))
+
+    async def one_request(index):
+        text, language = QUERIES[index % len(QUERIES)]
+        if endpoint == "transcribe":
+            request = client.post(
+                "/transcribe",
+                data={"language": language},
+                files={"audio": ("recording.wav", recording, "audio/wav")},
+            )
+        else:
+            request = client.post(f"/{endpoint}", data={"text": text, "language": language})
+
+        started = time.perf_counter()
+        try:
+            response = await request
+            await response.aread()
+        except httpx.HTTPError as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            return
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        if response.status_code >= 400:
+            errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+        for stage, duration in parse_server_timing(response.headers.get("server-timing", "")).items():
+            stages.setdefault(stage, []).append(duration)
+
+    async def worker():
+        for index in counter:
+            await one_request(index)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "endpoint": f"/{endpoint}",
+        "concurrency": concurrency,
+        "requests": total,
+        "completed": len(latencies),
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else None,
+        "latency_ms": percentiles(latencies),
+        "stages_ms": {stage: percentiles(sorted(values)) for stage, values in stages.items()},
+    }
+
+
+async def run(args):
+    recording = make_recording()
+    endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = []
+
+    async with Harness(args) as harness:
+        limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+        timeout = httpx.Timeout(args.timeout)
+        async with httpx.AsyncClient(base_url=harness.base_url, limits=limits, timeout=timeout) as client:
+            for endpoint in endpoints:
+                for concurrency in levels:
+                    # Warm-up requests are not measured
+                    await run_level(client, endpoint, concurrency, min(args.warmup, args.requests), recording)
+                    await harness.stub_stats(reset=True)
+
+                    result = await run_level(client, endpoint, concurrency, args.requests, recording)
+                    result["upstreams"] = await harness.stub_stats(reset=True)
+                    results.append(result)
+
+                    latency = result["latency_ms"]
+                    print(
+                        f"{result['endpoint']:<14} c={concurrency:<4} "
+                        f"rps={result['throughput_rps']:<9} "
+                        f"p50={latency.get('p50')}ms p95={latency.get('p95')}ms p99={latency.get('p99')}ms "
+                        f"errors={sum(result['errors'].values())}",
+                        file=sys.stderr,
+                    )
+
+    return {
+        "schema": 1,
+        "build": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": {"python": platform.python_version(), "cpus": os.cpu_count(), "platform": platform.platform()},
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SaarthiAI load test with local upstream stubs")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help="Comma-separated endpoints (get-guidance,respond,transcribe)")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per level")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests before each level")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout (s)")
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes")
+    parser.add_argument("--tts-cache", action="store_true", help="Keep the TTS cache enabled")
+    parser.add_argument("--base-url", help="Use an already running server instead of starting one")
+    parser.add_argument("--stub-url", help="Use already running upstream stubs instead of starting them")
+    for upstream in ("stt", "tts"):
+        parser.add_argument(f"--{upstream}-latency-ms", type=float, default=300.0)
+        parser.add_argument(f"--{upstream}-jitter-ms", type=float, default=50.0)
+        parser.add_argument(f"--{upstream}-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Write JSON results to this file (stdout if omitted)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Local stand-ins for the Google Speech and gTTS upstreams
+Serves the same wire formats with configurable latency and error injection
+
+Run:
+    python -m benchmarks.stub_upstreams --port 5100 --stt-latency-ms 300
+
+Point SaarthiAI at it with:
+    SAARTHI_GOOGLE_STT_URL=http://127.0.0.1:5100/speech-api/v2/recognize
+    SAARTHI_GTTS_URL=http://127.0.0.1:5100/_/TranslateWebserverUi/data/batchexecute
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request, Response
+from starlette.requests import ClientDisconnect
+import uvicorn
+
+STT_PATH = "/speech-api/v2/recognize"
+TTS_PATH = "/_/TranslateWebserverUi/data/batchexecute"
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz, ~26 ms)
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+class UpstreamFault:
+    """Latency and error behaviour of one stubbed upstream"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, hang_rate=0.0, hang_ms=30000.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_ms = hang_ms
+
+    def update(self, settings):
+        for name, value in settings.items():
+            if hasattr(self, name):
+                setattr(self, name, float(value))
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class UpstreamStats:
+    """Request counts and served latencies of one stubbed upstream"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.errors = 0
+        self.hangs = 0
+        self.latencies_ms = []
+
+    def summary(self):
+        latencies = sorted(self.latencies_ms)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "hangs": self.hangs,
+            "latency_ms": percentiles(latencies),
+        }
+
+
+def percentiles(sorted_values):
+    """p50/p95/p99/mean/max of an already sorted list"""
+    if not sorted_values:
+        return {}
+
+    def pick(fraction):
+        index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+        return round(sorted_values[index], 3)
+
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": round(sum(sorted_values) / len(sorted_values), 3),
+        "max": round(sorted_values[-1], 3),
+    }
+
+
+def create_app(transcript="fever", stt=None, tts=None):
+    """
+    Build the stub server
+
+    Args:
+        transcript: Text every recognition request returns
+        stt: UpstreamFault for the speech API
+        tts: UpstreamFault for the TTS API
+    """
+    app = FastAPI(title="SaarthiAI upstream stubs")
+    faults = {"stt": stt or UpstreamFault(), "tts": tts or UpstreamFault()}
+    stats = {"stt": UpstreamStats(), "tts": UpstreamStats()}
+    state = {"transcript": transcript}
+
+    async def inject(upstream):
+        """Apply configured delay and decide whether to fail; returns an error Response or None"""
+        fault = faults[upstream]
+        stats[upstream].requests += 1
+        started = time.perf_counter()
+
+        if fault.hang_rate and random.random() < fault.hang_rate:
+            stats[upstream].hangs += 1
+            await asyncio.sleep(fault.hang_ms / 1000)
+        else:
+            delay = max(0.0, random.gauss(fault.latency_ms, fault.jitter_ms)) if fault.jitter_ms else fault.latency_ms
+            if delay:
+                await asyncio.sleep(delay / 1000)
+
+        stats[upstream].latencies_ms.append((time.perf_counter() - started) * 1000)
+
+        if fault.error_rate and random.random() < fault.error_rate:
+            stats[upstream].errors += 1
+            return Response(status_code=503, content=b"injected failure")
+        return None
+
+    async def read_body(request):
+        """Request body, or None when the client gave up sending it (e.g. a cancelled hedge)"""
+        try:
+            return await request.body()
+        except ClientDisconnect:
+            return None
+
+    @app.post(STT_PATH)
+    async def recognize(request: Request):
+        if await read_body(request) is None:
+            return Response(status_code=499)
+        error = await inject("stt")
+        if error:
+            return error
+
+        result = {
+            "result": [{"alternative": [{"transcript": state["transcript"], "confidence": 0.92}], "final": True}],
+            "result_index": 0,
+        }
+        body = '{"result":[]}\n' + json.dumps(result) + "\n"
+        return Response(content=body, media_type="application/json")
+
+    @app.post(TTS_PATH)
+    async def synthesize(request: Request):
+        body = await read_body(request)
+        if body is None:
+            return Response(status_code=499)
+        error = await inject("tts")
+        if error:
+            return error
+
+        # Roughly one frame of audio per 8 bytes of request, like real speech length
+        frames = max(1, len(body) // 8)
+        audio = base64.b64encode(SILENT_MP3_FRAME * frames).decode("ascii")
+        payload = json.dumps(
+            [["wrb.fr", "jQ1olc", json.dumps([audio]), None, None, None, "generic"]],
+            separators=(",", ":"),
+        )
+        return Response(content=")]}'\n\n" + payload + "\n", media_type="application/json")
+
+    @app.get("/_stub/config")
+    async def get_config():
+        return {"transcript": state["transcript"], **{name: fault.as_dict() for name, fault in faults.items()}}
+
+    @app.post("/_stub/config")
+    async def set_config(request: Request):
+        """Change faults at runtime, e.g. {"tts": {"error_rate": 0.2}}"""
+        settings = await request.json()
+        for name, fault in faults.items():
+            fault.update(settings.get(name, {}))
+        if "transcript" in settings:
+            state["transcript"] = settings["transcript"]
+        return await get_config()
+
+    @app.get("/_stub/stats")
+    async def get_stats():
+        return {name: upstream.summary() for name, upstream in stats.items()}
+
+    @app.post("/_stub/reset")
+    async def reset_stats():
+        for upstream in stats.values():
+            upstream.reset()
+        return {"reset": True}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Google Speech / gTTS upstreams")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--transcript", default="fever")
+    for upstream in ("stt", "tts"):
+        parser.add_argument(f"--{upstream}-latency-ms", type=float, default=0.0)
+        parser.add_argument(f"--{upstream}-jitter-ms", type=float, default=0.0)
+        parser.add_argument(f"--{upstream}-error-rate", type=float, default=0.0)
+        parser.add_argument(f"--{upstream}-hang-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    def fault(upstream):
+        return UpstreamFault(
+            latency_ms=getattr(args, f"{upstream}_latency_ms"),
+            jitter_ms=getattr(args, f"{upstream}_jitter_ms"),
+            error_rate=getattr(args, f"{upstream}_error_rate"),
+            hang_rate=getattr(args, f"{upstream}_hang_rate"),
+        )
+
+    app = create_app(args.transcript, stt=fault("stt"), tts=fault("tts"))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,20 +3,38 @@ SaarthiAI - Multilingual Community Voice Assistant
 Main FastAPI application with REST API endpoints
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, FileResponse, Response, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.formparsers import MultiPartParser
 import uvicorn
+import asyncio
+import hashlib
+import json
 import os
 import logging
-from pathlib import Path
-import tempfile
-import shutil
+import re
+import time
+from collections import deque
+from typing import Optional
+import speech_recognition as sr
 
 # Import custom modules
 from models.logic import IntentEngine
-from utils.audio_helper import AudioHelper
+from models.knowledge_base import KnowledgeBase, DEFAULT_KNOWLEDGE_BASE
+from models.kb_bundle import BundlePublisher
+from utils.audio_helper import AudioHelper, open_streaming_decoder
+from utils.tts_cache import TTSCache
+from utils.audio_store import SharedAudioStore, SUPPORTED as AUDIO_STORE_SUPPORTED
+from utils.stt_backends import create_stt_backends, STT_BACKENDS
+from utils.tts_backends import create_tts_backends, TTS_BACKENDS
+from utils.upstream import UpstreamPool
+from utils.resilience import UpstreamError, CircuitBreaker, guard_backends
+from utils.audio_formats import AUDIO_FORMATS, FORMATS_BY_EXTENSION, MEDIA_TYPES, negotiate_format
+from utils.executors import run_in_stage, shutdown_executors
+from utils import metrics, tracing
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,16 +56,227 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+
+class RequestTelemetry:
+    """
+    Count, time and trace each HTTP request
+    
+    A plain ASGI middleware, so requests get no extra task or body wrapper.
+    Stage times go out in Server-Timing with the response headers, along
+    with the trace ID in X-Trace-Id so a slow request can be looked up in
+    the span file. The trace ends with the last body message, so streamed
+    audio is included. WebSocket sessions pass through untouched.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        method, path = scope["method"], scope["path"]
+        trace, root, tokens = tracing.start_trace(
+            f"{method} {path}",
+            traceparent=Headers(scope=scope).get("traceparent"),
+            attributes={"http.method": method, "http.target": path}
+        )
+        metrics.HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        state = {"status": None, "done": False}
+        
+        def route_path():
+            # Label by route template (e.g. /audio/{audio_key}) to keep label values bounded
+            return getattr(scope.get("route"), "path", None) or "unmatched"
+        
+        def response_started(status):
+            state["status"] = status
+            metrics.HTTP_SECONDS.observe(time.perf_counter() - started, method, route_path())
+            if scope.get("route") is not None:
+                root.name = f"{method} {route_path()}"
+            root.set_attribute("http.status_code", status)
+        
+        def finish(error=None):
+            if state["done"]:
+                return
+            state["done"] = True
+            if state["status"] is None:
+                response_started(500)
+            metrics.HTTP_REQUESTS.inc(method, route_path(), str(state["status"]))
+            metrics.HTTP_IN_FLIGHT.dec()
+            tracing.end_trace(root, error=error)
+        
+        async def send_with_telemetry(message):
+            if message["type"] == "http.response.start":
+                response_started(message["status"])
+                headers = MutableHeaders(scope=message)
+                headers["Server-Timing"] = trace.server_timing(total_ms=root.duration_ms)
+                headers["X-Trace-Id"] = trace.trace_id
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+        
+        try:
+            await self.app(scope, receive, send_with_telemetry)
+        except BaseException as e:
+            finish(e)
+            raise
+        finally:
+            # Also ends the trace of a response the client stopped reading
+            finish()
+            tracing.detach(tokens)
+
+
+app.add_middleware(RequestTelemetry)
+
+
 # Mount static files directory
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Create temp directory for audio files
-TEMP_DIR = Path("temp_audio")
-TEMP_DIR.mkdir(exist_ok=True)
+
+# Format speech is rendered and cached in (mp3, opus or wav); clients can
+# negotiate other formats and bitrates, which are transcoded from it
+TTS_FORMAT = os.environ.get("SAARTHI_TTS_FORMAT", "mp3")
+
+# Cache for rendered guidance audio (memory LRU + disk tier)
+TTS_CACHE_DIR = os.environ.get("SAARTHI_TTS_CACHE_DIR", "tts_cache")
+TTS_MEMORY_CACHE_MB = int(os.environ.get("SAARTHI_TTS_MEMORY_CACHE_MB", "32"))
+TTS_DISK_CACHE_MB = int(os.environ.get("SAARTHI_TTS_DISK_CACHE_MB", "256"))
+
+# Memory-mapped audio shared by all worker processes on the node; replaces
+# the per-process memory tier (empty disables it)
+AUDIO_STORE_DIR = os.environ.get("SAARTHI_AUDIO_STORE_DIR", "audio_store")
+AUDIO_STORE_MB = int(os.environ.get("SAARTHI_AUDIO_STORE_MB", "256"))
+
+audio_store = None
+if AUDIO_STORE_DIR and AUDIO_STORE_SUPPORTED:
+    audio_store = SharedAudioStore(AUDIO_STORE_DIR, max_bytes=AUDIO_STORE_MB * 1024 * 1024)
+
+tts_cache = TTSCache(
+    cache_dir=TTS_CACHE_DIR,
+    memory_limit=TTS_MEMORY_CACHE_MB * 1024 * 1024,
+    disk_limit=TTS_DISK_CACHE_MB * 1024 * 1024,
+    extension=AUDIO_FORMATS[TTS_FORMAT].extension,
+    shared_store=audio_store
+)
+
+# Number of guidance chunks synthesized ahead of playback in streaming mode
+TTS_STREAM_LOOKAHEAD = int(os.environ.get("SAARTHI_TTS_STREAM_LOOKAHEAD", "2"))
+
+# Cache keys are SHA-256 hex digests
+AUDIO_KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# HTTP caching: content-hashed URLs never change; URLs addressed by guidance
+# ID are revalidated with their ETag after GUIDANCE_MAX_AGE seconds, since a
+# knowledge-base update can change the text behind an ID
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+GUIDANCE_MAX_AGE = int(os.environ.get("SAARTHI_GUIDANCE_MAX_AGE", "300"))
+
+# Request traces (OTLP JSON lines); set SAARTHI_TRACE_FILE="" to disable
+TRACE_FILE = os.environ.get("SAARTHI_TRACE_FILE", "traces/spans.jsonl")
+TRACE_FILE_MB = int(os.environ.get("SAARTHI_TRACE_FILE_MB", "50"))
+tracing.configure(TRACE_FILE, max_bytes=TRACE_FILE_MB * 1024 * 1024)
+
+# Knowledge base file, re-checked for changes every few seconds
+KNOWLEDGE_BASE_PATH = os.environ.get("SAARTHI_KNOWLEDGE_BASE", str(DEFAULT_KNOWLEDGE_BASE))
+KB_RELOAD_INTERVAL = float(os.environ.get("SAARTHI_KB_RELOAD_INTERVAL", "5"))
+
+# Previous knowledge-base versions kept per worker for offline bundle deltas
+KB_BUNDLE_HISTORY = int(os.environ.get("SAARTHI_KB_BUNDLE_HISTORY", "8"))
+
+# Largest number of queries accepted in one /get-guidance/batch request
+BATCH_MAX_ITEMS = int(os.environ.get("SAARTHI_BATCH_MAX_ITEMS", "1000"))
+
+# Memoized answers for repeat questions (normalized query + language)
+GUIDANCE_CACHE_SIZE = int(os.environ.get("SAARTHI_GUIDANCE_CACHE_SIZE", "4096"))
+
+# Voice sessions: partial transcript interval (seconds of new audio, 0 disables)
+# and the largest recording accepted per utterance
+WS_PARTIAL_INTERVAL = float(os.environ.get("SAARTHI_WS_PARTIAL_INTERVAL", "2"))
+WS_MAX_UTTERANCE_MB = int(os.environ.get("SAARTHI_WS_MAX_UTTERANCE_MB", "10"))
+
+# Largest recording accepted by /transcribe and /ask. Uploads are decoded in
+# memory, so multipart files up to this size are never spooled to disk
+MAX_UPLOAD_MB = int(os.environ.get("SAARTHI_MAX_UPLOAD_MB", str(WS_MAX_UTTERANCE_MB)))
+MultiPartParser.spool_max_size = MAX_UPLOAD_MB * 1024 * 1024
+
+# Trim silence and normalize recordings before speech recognition
+AUDIO_FRONTEND = os.environ.get("SAARTHI_AUDIO_FRONTEND", "1") != "0"
 
 # Initialize intent engine and audio helper
-intent_engine = IntentEngine()
-audio_helper = AudioHelper()
+intent_engine = IntentEngine(
+    KnowledgeBase(KNOWLEDGE_BASE_PATH, reload_interval=KB_RELOAD_INTERVAL),
+    cache_size=GUIDANCE_CACHE_SIZE
+)
+kb_bundles = BundlePublisher(intent_engine.knowledge_base, history=KB_BUNDLE_HISTORY)
+
+# Keep-alive connection pools for the online STT/TTS engines (per host,
+# configured by SAARTHI_UPSTREAM_*)
+upstream_pool = UpstreamPool.from_env()
+
+# Online engines get per-request deadlines (SAARTHI_STT_DEADLINE,
+# SAARTHI_TTS_DEADLINE), hedged duplicates for slow calls (SAARTHI_HEDGE*)
+# and a circuit breaker (SAARTHI_BREAKER_*); when they fail, the fallback
+# engines below answer instead (empty disables the fallback)
+STT_FALLBACK = os.environ.get("SAARTHI_STT_FALLBACK", "")
+TTS_FALLBACK = os.environ.get("SAARTHI_TTS_FALLBACK", "")
+if STT_FALLBACK and STT_FALLBACK not in STT_BACKENDS:
+    raise ValueError(f"Unknown STT fallback backend '{STT_FALLBACK}'")
+if TTS_FALLBACK and TTS_FALLBACK not in TTS_BACKENDS:
+    raise ValueError(f"Unknown TTS fallback backend '{TTS_FALLBACK}'")
+
+stt_backends, stt_guards = guard_backends(create_stt_backends(pool=upstream_pool), "stt")
+tts_backends, tts_guards = guard_backends(
+    create_tts_backends(output_format=TTS_FORMAT, pool=upstream_pool), "tts"
+)
+
+audio_helper = AudioHelper(
+    tts_cache=tts_cache,
+    stt_backends=stt_backends,
+    tts_backends=tts_backends,
+    frontend=AUDIO_FRONTEND,
+    stt_fallback=STT_BACKENDS[STT_FALLBACK]() if STT_FALLBACK else None,
+    tts_fallback=TTS_BACKENDS[TTS_FALLBACK](output_format=TTS_FORMAT) if TTS_FALLBACK else None
+)
+
+metrics.Callback(
+    "saarthi_guidance_cache_requests_total",
+    "Memoized guidance lookups by result",
+    "counter",
+    lambda: {(result,): intent_engine.cache_info()[key] for result, key in (("hit", "hits"), ("miss", "misses"))},
+    ("result",)
+)
+metrics.Callback(
+    "saarthi_guidance_cache_entries",
+    "Answers currently memoized",
+    "gauge",
+    lambda: {(): intent_engine.cache_info()["size"]}
+)
+metrics.Callback(
+    "saarthi_upstream_circuit_open",
+    "Whether an engine's circuit breaker is failing calls fast (1) or not (0)",
+    "gauge",
+    lambda: {
+        (guard.service, guard.backend_name): int(guard.breaker.state == CircuitBreaker.OPEN)
+        for guard in stt_guards + tts_guards
+    },
+    ("service", "backend")
+)
+
+
+@app.exception_handler(UpstreamError)
+async def upstream_error_handler(request: Request, exc: UpstreamError):
+    """
+    Speech engine failures as structured JSON
+    
+    504 when the engine missed its deadline, 503 (with Retry-After) while
+    its circuit is open, 502 when it failed
+    """
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(max(1, round(exc.retry_after)))
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.to_dict()}, headers=headers)
 
 
 @app.get("/")
@@ -71,6 +300,168 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Pipeline metrics in the Prometheus text format
+    Stage latency histograms, in-flight gauges, intent/language counters,
+    upstream errors and TTS cache hits (per worker process)
+    """
+    return Response(
+        content=metrics.REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def detect_guidance(text, language):
+    """
+    Run intent detection and record it in the metrics
+    
+    Args:
+        text: User query text
+        language: Language code (en, hi, te)
+    
+    Returns:
+        Dict from IntentEngine.get_guidance
+    """
+    with tracing.stage("intent", language=language):
+        response_data = intent_engine.get_guidance(text, language)
+        tracing.set_attribute("intent", response_data['intent'])
+        tracing.set_attribute("guidance_id", response_data['guidance_id'])
+    metrics.INTENTS.inc(response_data['intent'], language)
+    return response_data
+
+
+def guidance_url(guidance_id):
+    """Cacheable GET URL for guidance text by ID"""
+    return f"/guidance/{guidance_id}"
+
+
+def etag_matches(request, etag):
+    """
+    Check If-None-Match against the current ETag (weak comparison, RFC 9110)
+    
+    Returns:
+        True when the client's copy is current and a 304 can be sent
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(headers):
+    """304 response carrying the validators and caching headers of the full one"""
+    return Response(status_code=304, headers=headers)
+
+
+async def transcribe_upload(audio, language):
+    """
+    Decode and transcribe an uploaded recording in memory
+    
+    Args:
+        audio: Uploaded audio file
+        language: Language code (en, hi, te)
+    
+    Returns:
+        Transcribed text
+    
+    Raises:
+        HTTPException: 413 when the recording is larger than MAX_UPLOAD_MB
+    """
+    if audio.size is not None and audio.size > MAX_UPLOAD_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail="Recording too long")
+    
+    with tracing.stage("upload"):
+        audio_bytes = await audio.read()
+    
+    # Decode and transcribe on separate pools so the event loop stays free
+    audio_data = await run_in_stage("decode", audio_helper.load_audio_bytes, audio_bytes)
+    text = await audio_helper.recognize_async(audio_data, language)
+    
+    logger.info(f"Transcribed: {text}")
+    return text
+
+
+def negotiate_audio(accept=None, audio_format=None, bitrate=None):
+    """
+    Pick the speech format for a response (400 for unsupported requests)
+    
+    Args:
+        accept: Accept header value
+        audio_format: Format parameter (mp3, opus, wav), wins over Accept
+        bitrate: Bitrate parameter in kbps
+    
+    Returns:
+        (format, bitrate or None)
+    """
+    try:
+        return negotiate_format(accept, audio_format, bitrate, default=TTS_FORMAT)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def stream_speech(text, language, audio_format=None, bitrate=None):
+    """
+    Synthesize guidance chunk by chunk and yield encoded audio in order
+    
+    Up to TTS_STREAM_LOOKAHEAD chunks are rendered in parallel ahead of the
+    one being sent, so memory stays bounded while the first chunk plays.
+    
+    Args:
+        text: Guidance text
+        language: Language code (en, hi, te)
+        audio_format: Output format, None for TTS_FORMAT
+        bitrate: Output bitrate in kbps, None for the format's default
+    
+    Yields:
+        One complete audio file per chunk (MP3 chunks can be concatenated)
+    
+    Raises:
+        UpstreamError: A chunk could not be synthesized
+    """
+    chunks = iter(audio_helper.split_for_speech(text))
+    pending = deque()
+    
+    def schedule_next():
+        chunk = next(chunks, None)
+        if chunk is not None:
+            pending.append(asyncio.ensure_future(
+                audio_helper.speech_bytes_async(chunk, language, audio_format, bitrate)
+            ))
+    
+    try:
+        for _ in range(max(1, TTS_STREAM_LOOKAHEAD)):
+            schedule_next()
+        
+        while pending:
+            audio_bytes = await pending.popleft()
+            schedule_next()
+            yield audio_bytes
+    
+    finally:
+        # Client went away or synthesis failed - drop work not yet sent
+        for future in pending:
+            future.cancel()
+
+
+async def stream_speech_body(text, language, audio_format=None, bitrate=None):
+    """stream_speech() as a response body, which can only end early on errors"""
+    speech = stream_speech(text, language, audio_format, bitrate)
+    try:
+        async for audio_bytes in speech:
+            yield audio_bytes
+    
+    except Exception as e:
+        # Headers are already sent, so the stream can only end early
+        logger.error(f"Streaming TTS error: {e}")
+    
+    finally:
+        await speech.aclose()
+
+
 @app.post("/transcribe")
 async def transcribe_audio(
     audio: UploadFile = File(...),
@@ -86,32 +477,12 @@ async def transcribe_audio(
     Returns:
         JSON with transcribed text
     """
-    temp_file = None
     try:
         # Validate language
         if language not in ['en', 'hi', 'te']:
             raise HTTPException(status_code=400, detail="Unsupported language")
         
-        # Secure filename handling - prevent None and path traversal
-        if not audio.filename:
-            safe_filename = "audio.wav"
-        else:
-            # Remove directory separators to prevent path traversal
-            safe_filename = os.path.basename(audio.filename)
-        
-        # Create unique temp file to avoid collisions
-        import uuid
-        unique_id = uuid.uuid4().hex[:8]
-        temp_file = TEMP_DIR / f"temp_{unique_id}_{safe_filename}"
-        
-        # Save uploaded file temporarily
-        with temp_file.open("wb") as buffer:
-            shutil.copyfileobj(audio.file, buffer)
-        
-        # Transcribe audio to text
-        text = audio_helper.transcribe_audio(str(temp_file), language)
-        
-        logger.info(f"Transcribed: {text}")
+        text = await transcribe_upload(audio, language)
         
         return {
             "success": True,
@@ -119,23 +490,21 @@ async def transcribe_audio(
             "language": language
         }
         
+    except (HTTPException, UpstreamError):
+        raise
     except Exception as e:
         logger.error(f"Transcription error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        # Always clean up temp file
-        if temp_file and temp_file.exists():
-            try:
-                temp_file.unlink()
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup temp file: {cleanup_error}")
 
 
 @app.post("/respond")
 async def generate_response(
+    request: Request,
     text: str = Form(...),
-    language: str = Form(default="en")
+    language: str = Form(default="en"),
+    stream: bool = Form(default=False),
+    audio_format: Optional[str] = Form(default=None, alias="format"),
+    bitrate: Optional[int] = Form(default=None)
 ):
     """
     Generate guidance response and audio for user query
@@ -143,6 +512,10 @@ async def generate_response(
     Args:
         text: User query text
         language: Language code (en, hi, te)
+        stream: Synthesize sentence chunks and stream them as they are ready
+        audio_format: Output format (mp3, opus, wav); the Accept header is
+            used when omitted
+        bitrate: Output bitrate in kbps (e.g. 16 or 24 for opus)
     
     Returns:
         Streaming audio response
@@ -152,25 +525,41 @@ async def generate_response(
         if language not in ['en', 'hi', 'te']:
             raise HTTPException(status_code=400, detail="Unsupported language")
         
+        audio_format, bitrate = negotiate_audio(request.headers.get("accept"), audio_format, bitrate)
+        
         # Get guidance from intent engine
-        response_data = intent_engine.get_guidance(text, language)
+        response_data = detect_guidance(text, language)
         guidance_text = response_data['guidance']
         
         logger.info(f"Intent: {response_data['intent']}, Language: {language}")
         
-        # Generate speech audio
-        audio_buffer = audio_helper.text_to_speech(guidance_text, language)
-        
-        # Return audio as streaming response (removed illegal headers with newlines)
-        return StreamingResponse(
-            audio_buffer,
-            media_type="audio/mpeg",
-            headers={
-                "Content-Disposition": "attachment; filename=response.mp3",
-                "X-Intent": response_data['intent']
-            }
+        headers = {
+            "Content-Disposition": f"attachment; filename=response.{AUDIO_FORMATS[audio_format].extension}",
+            "X-Intent": response_data['intent'],
+            "Vary": "Accept"
+        }
+        
+        # MP3 frames can be concatenated; Ogg and WAV files cannot
+        if stream and AUDIO_FORMATS[audio_format].concatenable:
+            # Start sending audio as soon as the first chunk is rendered
+            return StreamingResponse(
+                stream_speech_body(guidance_text, language, audio_format, bitrate),
+                media_type=MEDIA_TYPES[audio_format],
+                headers=headers
+            )
+        
+        # Generate speech audio (cache hits are views into the shared store)
+        audio_bytes = await audio_helper.speech_bytes_async(guidance_text, language, audio_format, bitrate)
+        
+        # Return audio (removed illegal headers with newlines)
+        return Response(
+            content=audio_bytes,
+            media_type=MEDIA_TYPES[audio_format],
+            headers=headers
         )
         
+    except (HTTPException, UpstreamError):
+        raise
     except Exception as e:
         logger.error(f"Response generation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -197,28 +586,609 @@ async def get_guidance_text(
             raise HTTPException(status_code=400, detail="Unsupported language")
         
         # Get guidance from intent engine
-        response_data = intent_engine.get_guidance(text, language)
+        response_data = detect_guidance(text, language)
         
         return {
             "success": True,
             "text": text,
             "intent": response_data['intent'],
             "guidance": response_data['guidance'],
+            "guidance_id": response_data['guidance_id'],
+            "guidance_url": guidance_url(response_data['guidance_id']),
             "language": language
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Guidance error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# Cleanup temp files on shutdown
+def classify_batch(items, start=0):
+    """
+    Validate and classify a group of batch items in one IntentEngine pass
+    
+    Args:
+        items: Decoded request items ({"text", "language", optional "id"}),
+            or a ValueError for an item that could not be decoded
+        start: Position of the first item in the whole batch
+    
+    Returns:
+        Result dicts in input order; invalid items get success=false
+    """
+    results = [None] * len(items)
+    queries = []
+    positions = []
+    
+    for offset, item in enumerate(items):
+        result = {"index": start + offset}
+        if isinstance(item, dict) and "id" in item:
+            result["id"] = item["id"]
+        results[offset] = result
+        
+        if isinstance(item, ValueError):
+            result.update(success=False, error=str(item))
+        elif not isinstance(item, dict) or not isinstance(item.get("text"), str) or not item["text"].strip():
+            result.update(success=False, error="Item needs a non-empty text")
+        elif item.get("language", "en") not in ['en', 'hi', 'te']:
+            result.update(success=False, error="Unsupported language")
+        else:
+            queries.append((item["text"], item.get("language", "en")))
+            positions.append(offset)
+    
+    if queries:
+        with tracing.stage("intent", items=len(queries)):
+            answers = intent_engine.get_guidance_batch(queries)
+        for offset, response_data in zip(positions, answers):
+            metrics.INTENTS.inc(response_data['intent'], response_data['language'])
+            results[offset].update(
+                success=True,
+                text=response_data['text'],
+                intent=response_data['intent'],
+                guidance=response_data['guidance'],
+                guidance_id=response_data['guidance_id'],
+                guidance_url=guidance_url(response_data['guidance_id']),
+                language=response_data['language']
+            )
+    return results
+
+
+async def ndjson_items(request):
+    """
+    Decode an NDJSON request body line by line as it arrives
+    
+    Yields:
+        Lists of items (decoded objects, or a ValueError per bad line),
+        one list per received chunk
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        items = [_decode_line(line) for line in lines if line.strip()]
+        if items:
+            yield items
+    if buffer.strip():
+        yield [_decode_line(buffer)]
+
+
+def _decode_line(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return ValueError("Invalid JSON")
+
+
+@app.post("/get-guidance/batch")
+async def get_guidance_batch(request: Request):
+    """
+    Classify many queries in one request (for SMS and IVR gateways)
+    
+    Body:
+        JSON array of {"text", "language", "id"} items (or {"items": [...]}),
+        or NDJSON with one item per line (Content-Type: application/x-ndjson),
+        which is classified chunk by chunk while it is still being uploaded
+    
+    Returns:
+        Results streamed in input order, as NDJSON when the body was NDJSON
+        or Accept asks for it, otherwise as a JSON array. Each result has
+        index, the echoed id, success and the /get-guidance fields, or an
+        error for that item alone.
+    """
+    content_type = request.headers.get("content-type", "")
+    ndjson_in = "ndjson" in content_type or "jsonl" in content_type
+    ndjson_out = ndjson_in or "application/x-ndjson" in request.headers.get("accept", "")
+    
+    encoded = []
+    
+    def add(group):
+        """Classify the next group; False once the item limit is reached"""
+        start = len(encoded)
+        full = start + len(group) > BATCH_MAX_ITEMS
+        if full:
+            group = group[:BATCH_MAX_ITEMS - start] + [ValueError(f"At most {BATCH_MAX_ITEMS} items per batch")]
+        encoded.extend(json.dumps(result, ensure_ascii=False) for result in classify_batch(group, start))
+        return not full
+    
+    if ndjson_in:
+        # The body has to be read before responding (the response task
+        # listens on the same channel), so classify it as it arrives
+        async for group in ndjson_items(request):
+            if not add(group):
+                break
+    else:
+        try:
+            payload = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        items = payload.get("items") if isinstance(payload, dict) else payload
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if len(items) > BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+        add(items)
+    
+    logger.info(f"Batch guidance: {len(encoded)} items")
+    
+    def results(chunk_size=256):
+        if not ndjson_out:
+            yield "["
+        for start in range(0, len(encoded), chunk_size):
+            chunk = encoded[start:start + chunk_size]
+            if ndjson_out:
+                yield "".join(line + "\n" for line in chunk)
+            else:
+                yield ("," if start else "") + ",".join(chunk)
+        if not ndjson_out:
+            yield "]"
+    
+    return StreamingResponse(
+        results(),
+        media_type="application/x-ndjson" if ndjson_out else "application/json"
+    )
+
+
+@app.post("/ask")
+async def ask(
+    text: Optional[str] = Form(default=None),
+    language: str = Form(default="en"),
+    audio: Optional[UploadFile] = File(default=None),
+    audio_format: Optional[str] = Form(default=None, alias="format"),
+    bitrate: Optional[int] = Form(default=None)
+):
+    """
+    Answer a query in one round trip: guidance text plus an audio URL
+    
+    Intent detection runs once. The guidance audio is rendered into the
+    TTS cache before returning, so the client can fetch audio_url right away.
+    
+    Args:
+        text: User query text (optional when audio is sent)
+        language: Language code (en, hi, te)
+        audio: Optional recording, transcribed in the same call
+        audio_format: Format of the audio behind audio_url (mp3, opus, wav)
+        bitrate: Bitrate of that audio in kbps
+    
+    Returns:
+        JSON with query text, intent, guidance and audio URL
+    """
+    try:
+        # Validate language
+        if language not in ['en', 'hi', 'te']:
+            raise HTTPException(status_code=400, detail="Unsupported language")
+        audio_format, bitrate = negotiate_audio(None, audio_format, bitrate)
+        
+        if audio is not None:
+            text = await transcribe_upload(audio, language)
+        if not text:
+            raise HTTPException(status_code=400, detail="Send either text or audio")
+        
+        # Get guidance from intent engine
+        response_data = detect_guidance(text, language)
+        guidance_text = response_data['guidance']
+        
+        logger.info(f"Intent: {response_data['intent']}, Language: {language}")
+        
+        # Render (or find) the audio in the cache so /audio can serve it
+        await audio_helper.speech_bytes_async(guidance_text, language, audio_format, bitrate)
+        audio_key = audio_helper.tts_cache_key(guidance_text, language, audio_format, bitrate)
+        extension = AUDIO_FORMATS[audio_format].extension
+        audio_url = f"/audio/{audio_key}.{extension}" if audio_key else None
+        if audio_key and not tts_cache.contains(audio_key, extension):
+            # Fallback speech is not stored under the key; the guidance ID
+            # URL renders it again (from the engine once it is back)
+            guidance_id = response_data['guidance_id']
+            audio_url = f"/audio/{guidance_id}.{extension}" if guidance_id else None
+            if audio_url and bitrate:
+                audio_url += f"?bitrate={bitrate}"
+        
+        return {
+            "success": True,
+            "text": text,
+            "intent": response_data['intent'],
+            "guidance": guidance_text,
+            "guidance_id": response_data['guidance_id'],
+            "guidance_url": guidance_url(response_data['guidance_id']),
+            "language": language,
+            "audio_url": audio_url
+        }
+        
+    except (HTTPException, UpstreamError):
+        raise
+    except Exception as e:
+        logger.error(f"Ask error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/guidance/{guidance_id}")
+async def get_guidance_by_id(guidance_id: str, request: Request):
+    """
+    Guidance text by its stable ID (e.g. health.fever.hi)
+    
+    Args:
+        guidance_id: ID returned as guidance_id by the other endpoints
+    
+    Returns:
+        JSON with the guidance and its audio URL, with a strong ETag of the
+        text (If-None-Match is answered with 304)
+    """
+    guidance = intent_engine.guidance_by_id(guidance_id)
+    if guidance is None:
+        raise HTTPException(status_code=404, detail="Guidance not found")
+    
+    headers = {
+        "ETag": f'"{guidance.digest}"',
+        "Cache-Control": f"public, max-age={GUIDANCE_MAX_AGE}"
+    }
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    return Response(
+        content=json.dumps({
+            "success": True,
+            "guidance_id": guidance.id,
+            "intent": guidance.intent,
+            "topic": guidance.topic,
+            "guidance": guidance.text,
+            "language": guidance.language,
+            "text_language": guidance.text_language,
+            "audio_url": f"/audio/{guidance.id}.{AUDIO_FORMATS[TTS_FORMAT].extension}"
+        }, ensure_ascii=False),
+        media_type="application/json",
+        headers=headers
+    )
+
+
+@app.get("/kb/bundle")
+async def get_kb_bundle(request: Request, since: Optional[str] = None):
+    """
+    Knowledge base for offline use and client-side matching
+    
+    Args:
+        since: Digest of the bundle the client already has; a delta is sent
+            when this worker still knows that version
+    
+    Returns:
+        Full bundle or delta JSON (gzip-compressed when accepted), 304 when
+        the client is up to date
+    """
+    current = kb_bundles.current()
+    gzipped = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        # Each encoding is its own representation, so it gets its own ETag
+        "ETag": f'"{current.digest}-gz"' if gzipped else f'"{current.digest}"',
+        "Cache-Control": f"public, max-age={GUIDANCE_MAX_AGE}",
+        "Vary": "Accept-Encoding"
+    }
+    if since == current.digest or etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    bundle = kb_bundles.update_for(since) if since else current
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        body = bundle.gzip_body
+    else:
+        body = bundle.body
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/audio/{audio_key}")
+async def get_audio(audio_key: str, request: Request, bitrate: Optional[int] = None):
+    """
+    Serve guidance audio by content-addressed key or by guidance ID
+    
+    Args:
+        audio_key: Either a cache key returned by /ask, with the format's
+            extension (.mp3, .ogg, .wav; a bare key is served as TTS_FORMAT),
+            or a guidance ID with an extension (e.g. health.fever.hi.ogg).
+            A key is only found with the extension of the encoding it was
+            rendered in, so audio is never served under another format's
+            media type
+        bitrate: Bitrate in kbps for audio addressed by guidance ID
+    
+    Returns:
+        Audio with a strong ETag; cacheable forever for content keys, and
+        revalidated after GUIDANCE_MAX_AGE for guidance IDs
+    """
+    name, dot, extension = audio_key.rpartition(".")
+    if not dot:
+        name, extension = audio_key, ""
+    audio_format = FORMATS_BY_EXTENSION.get(extension) if extension else TTS_FORMAT
+    if audio_format is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    
+    if AUDIO_KEY_PATTERN.fullmatch(name):
+        # The key hashes the text, voice and encoding, so it is its own ETag
+        headers = {"ETag": f'"{name}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers)
+        
+        audio_bytes = await run_in_stage("tts", tts_cache.get, name, AUDIO_FORMATS[audio_format].extension)
+        if audio_bytes is None:
+            # Also when the key exists in another encoding than the extension says
+            raise HTTPException(status_code=404, detail="Audio not found")
+        return Response(content=audio_bytes, media_type=MEDIA_TYPES[audio_format], headers=headers)
+    
+    guidance = intent_engine.guidance_by_id(name) if extension else None
+    if guidance is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    audio_format, bitrate = negotiate_audio(None, audio_format, bitrate)
+    
+    headers = {"Cache-Control": f"public, max-age={GUIDANCE_MAX_AGE}"}
+    audio_key = audio_helper.tts_cache_key(guidance.text, guidance.language, audio_format, bitrate)
+    if audio_key:
+        headers["ETag"] = f'"{audio_key}"'
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers)
+    
+    audio_bytes = await audio_helper.speech_bytes_async(guidance.text, guidance.language, audio_format, bitrate)
+    if not audio_key or not tts_cache.contains(audio_key, extension):
+        # Without the cached rendering (no TTS cache, or speech from the
+        # fallback engine) the ETag can only come from the audio itself
+        headers["ETag"] = f'"{hashlib.sha256(audio_bytes).hexdigest()}"'
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers)
+    
+    return Response(content=audio_bytes, media_type=MEDIA_TYPES[audio_format], headers=headers)
+
+
+async def recognize_partial(pcm, language):
+    """
+    Best-effort transcript of the audio received so far
+    
+    Returns:
+        Text, or None if nothing was recognized yet
+    """
+    audio_data = await run_in_stage("decode", audio_helper.prepare_pcm, pcm)
+    backend = audio_helper.get_stt_backend(language)
+    try:
+        with tracing.stage("stt_partial", backend=backend.name, language=language):
+            return await backend.recognize_async(audio_data, language)
+    except (sr.UnknownValueError, sr.RequestError, UpstreamError):
+        return None
+
+
+@app.websocket("/ws/session")
+async def voice_session(websocket: WebSocket):
+    """
+    Persistent voice session: stream audio in, get transcripts, guidance and audio back
+    
+    Client messages:
+        {"type": "start", "language": "hi"}  begin an utterance
+            (start and text may also set "format" and "bitrate" for the
+            guidance audio, kept for the rest of the session)
+        binary frames                         encoded audio chunks (e.g. MediaRecorder WebM)
+        {"type": "stop"}                      end of the utterance
+        {"type": "text", "text": "...", "language": "en"}  typed query
+        {"type": "cancel"}                    drop the current utterance
+    
+    Server messages:
+        {"type": "partial", "text": ...}      interim transcript while recording
+        {"type": "final", "text": ...}        transcript of the whole utterance
+        {"type": "guidance", ...}             intent, guidance text and IDs
+        binary frames                         guidance audio, one playable clip each
+        {"type": "audio_end"}                 no more audio for this answer (an error
+                                              frame instead when synthesis fails)
+        {"type": "error", "detail": ...}     (speech engine failures add
+            "error": {"code", "service", "backend", "message", "retry_after"})
+    """
+    await websocket.accept()
+    metrics.WS_SESSIONS.inc()
+    
+    send_lock = asyncio.Lock()
+    session = {
+        "language": "en", "audio": (TTS_FORMAT, None),
+        "decoder": None, "partial": None, "partial_at": 0, "trace": None
+    }
+    
+    async def send_json(message):
+        async with send_lock:
+            await websocket.send_text(json.dumps(message, ensure_ascii=False))
+    
+    async def send_partial(pcm, language):
+        try:
+            text = await recognize_partial(pcm, language)
+            if text and session["decoder"] is not None:
+                await send_json({"type": "partial", "text": text})
+        except Exception as e:
+            # Interim results are optional; the final transcript still follows
+            logger.warning(f"Partial transcript failed: {e}")
+    
+    def begin_trace(name):
+        session["trace"] = tracing.start_trace(f"WS /ws/session {name}", attributes={"language": session["language"]})
+    
+    def end_trace(error=None):
+        if session["trace"] is not None:
+            trace, root, tokens = session["trace"]
+            tracing.end_trace(root, error=error)
+            tracing.detach(tokens)
+            session["trace"] = None
+    
+    async def drop_utterance():
+        if session["partial"] is not None:
+            session["partial"].cancel()
+            session["partial"] = None
+        decoder, session["decoder"] = session["decoder"], None
+        if decoder is not None:
+            await asyncio.to_thread(decoder.abort)
+    
+    async def answer(text, language):
+        """Send guidance for a query, then its audio clip by clip"""
+        response_data = detect_guidance(text, language)
+        audio_format, bitrate = session["audio"]
+        trace = session["trace"][0] if session["trace"] else None
+        await send_json({
+            "type": "guidance",
+            "text": text,
+            "intent": response_data['intent'],
+            "guidance": response_data['guidance'],
+            "guidance_id": response_data['guidance_id'],
+            "language": language,
+            "audio_media_type": MEDIA_TYPES[audio_format],
+            "timing": {stage: round(ms, 1) for stage, ms in trace.stages.items()} if trace else {}
+        })
+        
+        # Every frame is a complete file, so any format can be sent chunk by chunk
+        async for audio_chunk in stream_speech(response_data['guidance'], language, audio_format, bitrate):
+            async with send_lock:
+                await websocket.send_bytes(audio_chunk)
+        await send_json({"type": "audio_end"})
+    
+    async def finish_utterance():
+        decoder, session["decoder"] = session["decoder"], None
+        if session["partial"] is not None:
+            session["partial"].cancel()
+            session["partial"] = None
+        
+        language = session["language"]
+        with tracing.stage("decode", input_bytes=decoder.bytes_in):
+            pcm = await run_in_stage("decode", decoder.finish)
+        audio_data = await run_in_stage("decode", audio_helper.prepare_pcm, pcm)
+        text = await audio_helper.recognize_async(audio_data, language)
+        logger.info(f"Transcribed: {text}")
+        
+        await send_json({"type": "final", "text": text})
+        await answer(text, language)
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            # Audio chunk for the current utterance
+            if message.get("bytes") is not None:
+                decoder = session["decoder"]
+                if decoder is None:
+                    await send_json({"type": "error", "detail": "Send start before audio"})
+                    continue
+                if decoder.bytes_in + len(message["bytes"]) > WS_MAX_UTTERANCE_MB * 1024 * 1024:
+                    await drop_utterance()
+                    end_trace()
+                    await send_json({"type": "error", "detail": "Recording too long"})
+                    continue
+                
+                await run_in_stage("decode", decoder.feed, message["bytes"])
+                
+                # Interim transcript once enough new audio has been decoded
+                if (WS_PARTIAL_INTERVAL and session["partial"] is None
+                        and decoder.decoded_seconds - session["partial_at"] >= WS_PARTIAL_INTERVAL):
+                    session["partial_at"] = decoder.decoded_seconds
+                    task = asyncio.ensure_future(send_partial(decoder.pcm(), session["language"]))
+                    task.add_done_callback(lambda _: session.update(partial=None))
+                    session["partial"] = task
+                continue
+            
+            try:
+                request = json.loads(message.get("text") or "")
+            except ValueError:
+                await send_json({"type": "error", "detail": "Invalid message"})
+                continue
+            kind = request.get("type")
+            language = request.get("language", session["language"])
+            if language not in ['en', 'hi', 'te']:
+                await send_json({"type": "error", "detail": "Unsupported language"})
+                continue
+            if "format" in request or "bitrate" in request:
+                try:
+                    session["audio"] = negotiate_format(
+                        None, request.get("format"), request.get("bitrate"), default=TTS_FORMAT
+                    )
+                except ValueError as e:
+                    await send_json({"type": "error", "detail": str(e)})
+                    continue
+            
+            try:
+                if kind == "start":
+                    await drop_utterance()
+                    end_trace()
+                    session["language"] = language
+                    session["partial_at"] = 0
+                    begin_trace("utterance")
+                    session["decoder"] = await asyncio.to_thread(open_streaming_decoder)
+                
+                elif kind == "stop":
+                    if session["decoder"] is None:
+                        await send_json({"type": "error", "detail": "No recording in progress"})
+                        continue
+                    await finish_utterance()
+                    end_trace()
+                
+                elif kind == "text":
+                    text = (request.get("text") or "").strip()
+                    if not text:
+                        await send_json({"type": "error", "detail": "Empty query"})
+                        continue
+                    session["language"] = language
+                    begin_trace("text")
+                    await answer(text, language)
+                    end_trace()
+                
+                elif kind == "cancel":
+                    await drop_utterance()
+                    end_trace()
+                
+                else:
+                    await send_json({"type": "error", "detail": f"Unknown message type: {kind}"})
+            
+            except WebSocketDisconnect:
+                raise
+            except UpstreamError as e:
+                logger.error(f"Voice session error: {e}")
+                await drop_utterance()
+                end_trace(error=e)
+                await send_json({"type": "error", "detail": e.message, "error": e.to_dict()})
+            except Exception as e:
+                logger.error(f"Voice session error: {e}")
+                await drop_utterance()
+                end_trace(error=e)
+                await send_json({"type": "error", "detail": str(e)})
+    
+    except WebSocketDisconnect:
+        pass
+    
+    finally:
+        await drop_utterance()
+        end_trace()
+        metrics.WS_SESSIONS.dec()
+
+
+# Load speech models once per worker before serving requests
+@app.on_event("startup")
+async def warm_up():
+    """Load offline STT models so the first request does not wait for them"""
+    await run_in_stage("stt", audio_helper.warm_up)
+
+
+# Release connections and threads on shutdown
 @app.on_event("shutdown")
 async def cleanup():
-    """Clean up temporary files on server shutdown"""
-    if TEMP_DIR.exists():
-        shutil.rmtree(TEMP_DIR)
-    logger.info("Cleaned up temporary files")
+    """Close upstream connections, stage pools and the trace writer on server shutdown"""
+    await upstream_pool.aclose()
+    shutdown_executors()
+    tracing.shutdown()
+    logger.info("Released worker resources")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+"""
+Offline knowledge-base bundles for SaarthiAI
+Compact, versioned and gzip-compressed copies of the keyword index and
+guidance text, with deltas between versions, for client-side matching
+"""
+
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+from models.keyword_matcher import LATIN_SUFFIXES
+from models.knowledge_base import GENERAL_TOPIC
+
+# Bump when the bundle layout changes so old clients fetch a full copy
+BUNDLE_SCHEMA = 1
+
+
+class Bundle:
+    """
+    One encoded bundle or delta
+
+    Attributes:
+        digest: Knowledge-base digest the payload brings the client to
+        payload: Decoded JSON document
+        body: UTF-8 JSON bytes
+        gzip_body: gzip-compressed body (compressed once, served many times)
+    """
+
+    __slots__ = ('digest', 'payload', 'body', 'gzip_body')
+
+    def __init__(self, digest, payload):
+        self.digest = digest
+        self.payload = payload
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        # mtime=0 keeps the output identical across workers and restarts
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+
+
+def build_bundle(snapshot):
+    """
+    Everything a client needs to answer text queries without the server
+
+    Keywords are already normalized, so the client only has to normalize
+    the query the same way (see normalize_query) and scan it with the
+    same word-boundary rules as KeywordMatcher.
+
+    Args:
+        snapshot: KnowledgeSnapshot
+
+    Returns:
+        JSON-serializable dict
+    """
+    return {
+        'type': 'full',
+        'schema': BUNDLE_SCHEMA,
+        'version': snapshot.version,
+        'digest': snapshot.digest,
+        'default_language': snapshot.default_language,
+        'general_topic': GENERAL_TOPIC,
+        'languages': list(snapshot.languages),
+        'latin_suffixes': list(LATIN_SUFFIXES),
+        'intent_priority': list(snapshot.intent_priority),
+        'keywords': snapshot.keywords,
+        # Topic order decides which sub-topic wins, so topics are pairs
+        'topics': {
+            intent: [[topic, snapshot.topic_keywords.get(intent, {}).get(topic, [])] for topic in topics]
+            for intent, topics in snapshot.topics.items()
+        },
+        'guidance': snapshot.entries,
+    }
+
+
+def _changed(old, new):
+    """Keys of new whose value differs from old, plus removed keys mapped to None"""
+    changes = {key: value for key, value in new.items() if old.get(key) != value}
+    changes.update({key: None for key in old if key not in new})
+    return changes
+
+
+def build_delta(base, target):
+    """
+    Changes that turn the base bundle into the target bundle
+
+    Keyword and topic lists are replaced per intent, guidance entries are
+    replaced or removed by ID, and the small top-level fields are always
+    sent in full.
+
+    Args:
+        base: Bundle payload the client has
+        target: Current bundle payload
+
+    Returns:
+        JSON-serializable dict
+    """
+    base_entries = {entry['id']: entry for entry in base['guidance']}
+    target_ids = {entry['id'] for entry in target['guidance']}
+
+    delta = {key: value for key, value in target.items() if key not in ('keywords', 'topics', 'guidance')}
+    delta.update({
+        'type': 'delta',
+        'base': base['digest'],
+        'keywords': _changed(base['keywords'], target['keywords']),
+        'topics': _changed(base['topics'], target['topics']),
+        'guidance': {
+            'upsert': [entry for entry in target['guidance'] if base_entries.get(entry['id']) != entry],
+            'remove': [entry_id for entry_id in base_entries if entry_id not in target_ids],
+        },
+    })
+    return delta
+
+
+class BundlePublisher:
+    """
+    Serves the bundle of the current knowledge base and deltas from recent ones
+
+    Bundles are built and compressed once per knowledge-base version. The
+    last `history` versions seen by this worker are kept so clients on one
+    of them download only what changed; older clients get a full bundle.
+    """
+
+    def __init__(self, knowledge_base, history=8):
+        """
+        Args:
+            knowledge_base: KnowledgeBase to publish
+            history: Previous versions kept for deltas
+        """
+        self.knowledge_base = knowledge_base
+        self.history = history
+        self._bundles = OrderedDict()
+        self._deltas = {}
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Bundle for the current knowledge-base version"""
+        snapshot = self.knowledge_base.snapshot
+        with self._lock:
+            bundle = self._bundles.get(snapshot.digest)
+            if bundle is None:
+                bundle = self._bundles[snapshot.digest] = Bundle(snapshot.digest, build_bundle(snapshot))
+                while len(self._bundles) > self.history + 1:
+                    old_digest, _ = self._bundles.popitem(last=False)
+                    self._deltas = {key: delta for key, delta in self._deltas.items() if old_digest not in key}
+            return bundle
+
+    def update_for(self, base_digest):
+        """
+        Smallest download that brings a client up to date
+
+        Args:
+            base_digest: Digest of the bundle the client has (None for none)
+
+        Returns:
+            Delta Bundle when the base version is known, otherwise the full one
+        """
+        current = self.current()
+        with self._lock:
+            base = self._bundles.get(base_digest)
+            if base is None or base is current:
+                return current
+
+            key = (base_digest, current.digest)
+            delta = self._deltas.get(key)
+            if delta is None:
+                delta = self._deltas[key] = Bundle(current.digest, build_delta(base.payload, current.payload))
+            # A delta is pointless if it is not smaller than the full bundle
+            return delta if len(delta.gzip_body) < len(current.gzip_body) else current
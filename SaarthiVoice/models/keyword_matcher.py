@@ -0,0 +1,168 @@
+"""
+Multi-pattern keyword matcher for SaarthiAI
+Aho-Corasick automaton that finds every intent and topic keyword in one pass
+"""
+
+import unicodedata
+from collections import deque
+
+# English inflections accepted after a Latin keyword ("schemes", "vomiting")
+LATIN_SUFFIXES = ('s', 'es', 'ing', 'ed')
+
+
+def is_word_char(char):
+    """Return True for letters, combining marks (matras) and digits"""
+    return unicodedata.category(char)[0] in ('L', 'M', 'N')
+
+
+# Codepoints the separator table remembers: Latin, the Indic scripts and
+# general punctuation. Others are classified on every lookup, so arbitrary
+# input (emoji, CJK, ...) cannot grow the table without bound
+SEPARATOR_TABLE_LIMIT = 0x3000
+
+
+class _SeparatorTable(dict):
+    """str.translate table mapping non-word characters to a space (filled on demand)"""
+
+    def __missing__(self, codepoint):
+        value = codepoint if is_word_char(chr(codepoint)) else ord(' ')
+        if codepoint < SEPARATOR_TABLE_LIMIT:
+            self[codepoint] = value
+        return value
+
+
+_SEPARATORS = _SeparatorTable()
+
+
+def normalize_query(text):
+    """
+    Canonical form of a query, used to match and memoize it
+
+    Applies Unicode NFC and casefolding, and collapses every run of
+    whitespace and punctuation into one space, so "Fever?", " fever " and
+    "FEVER!!" all become "fever". Keywords only contain letters and
+    spaces, so matching the normalized text gives the same result.
+    """
+    text = unicodedata.normalize('NFC', unicodedata.normalize('NFC', text).casefold())
+    return ' '.join(text.translate(_SEPARATORS).split())
+
+
+def is_latin(keyword):
+    """Return True if the keyword is written in ASCII (English) script"""
+    return keyword.isascii()
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over keywords from every language
+
+    Each keyword carries one or more labels. A single scan of the query
+    returns the set of labels whose keywords occur as whole words.
+
+    Word boundary rules:
+    - A keyword must start at the beginning of a word ('air' does not
+      match inside 'chair', 'hot' does not match inside 'shot')
+    - A Latin keyword must also end the word, optionally followed by an
+      English inflection ('scheme' matches 'schemes')
+    - Hindi and Telugu keywords may be followed by suffixes, because
+      case markers and postpositions attach to the word in these languages
+    """
+
+    def __init__(self):
+        # Node 0 is the root; each node has goto edges, a fail link and outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._built = False
+
+    def add(self, keyword, label):
+        """
+        Register a keyword for a label
+
+        Args:
+            keyword: Keyword text in any supported language
+            label: Hashable label reported when the keyword matches
+        """
+        keyword = normalize_query(keyword)
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][char] = next_node
+            node = next_node
+
+        self._output[node].append((len(keyword), is_latin(keyword), label))
+        self._built = False
+
+    def build(self):
+        """Compute fail links breadth-first (call after all keywords are added)"""
+        queue = deque()
+        for node in self._goto[0].values():
+            self._fail[node] = 0
+            queue.append(node)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                # Inherit matches that end at the fail state
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+        self._built = True
+        return self
+
+    def find(self, text):
+        """
+        Scan text once and return all labels matched on word boundaries
+
+        Args:
+            text: User query
+
+        Returns:
+            Set of labels
+        """
+        if not self._built:
+            self.build()
+
+        text = text.casefold()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        labels = set()
+        node = 0
+
+        for end, char in enumerate(text, start=1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            for length, latin, label in output[node]:
+                if label in labels:
+                    continue
+                if self._on_boundary(text, end - length, end, latin):
+                    labels.add(label)
+
+        return labels
+
+    @staticmethod
+    def _on_boundary(text, start, end, latin):
+        """Check that a match at text[start:end] is a whole word"""
+        if start > 0 and is_word_char(text[start - 1]):
+            return False
+        if not latin:
+            return True
+
+        # Latin keywords must end the word, allowing an inflection
+        for suffix in ('',) + LATIN_SUFFIXES:
+            tail = end + len(suffix)
+            if text.startswith(suffix, end) and (tail >= len(text) or not is_word_char(text[tail])):
+                return True
+        return False
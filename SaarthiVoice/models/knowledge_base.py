@@ -0,0 +1,221 @@
+"""
+Versioned knowledge base for SaarthiAI
+Loads guidance and keywords from knowledge_base.json into an indexed snapshot
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from models.keyword_matcher import KeywordMatcher, normalize_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KNOWLEDGE_BASE = Path(__file__).with_name("knowledge_base.json")
+
+# Topic used for an intent when no more specific sub-topic matched
+GENERAL_TOPIC = 'general'
+
+
+class Guidance:
+    """
+    One guidance text in one language
+
+    Attributes:
+        id: Stable guidance ID, "<entry id>.<language>" (e.g. health.fever.hi)
+        entry_id: Knowledge-base entry ID (e.g. health.fever)
+        intent: Intent the guidance answers
+        topic: Sub-topic within the intent
+        language: Language the guidance was requested in
+        text: Guidance text
+        text_language: Language the text is written in (differs on fallback)
+        digest: SHA-256 of the text, for cache validation
+    """
+
+    __slots__ = ('id', 'entry_id', 'intent', 'topic', 'language', 'text', 'text_language', 'digest')
+
+    def __init__(self, entry_id, intent, topic, language, text, text_language):
+        self.id = f"{entry_id}.{language}"
+        self.entry_id = entry_id
+        self.intent = intent
+        self.topic = topic
+        self.language = language
+        self.text = text
+        self.text_language = text_language
+        self.digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class KnowledgeSnapshot:
+    """
+    Immutable compiled view of one knowledge-base version
+
+    Holds the keyword automaton and an index keyed by (intent, topic,
+    language), so guidance lookup is a single dictionary access. The
+    normalized keyword lists and guidance entries are kept as well, for
+    the offline bundle published to clients.
+    """
+
+    def __init__(self, data, digest):
+        self.version = data['version']
+        self.digest = digest
+        self.default_language = data.get('default_language', 'en')
+        self.intent_priority = tuple(data['intent_priority'])
+        self.topics = {intent: tuple(topics) for intent, topics in data.get('topics', {}).items()}
+        self.languages = tuple(sorted({
+            language for entry in data['guidance'] for language in entry['text']
+        }))
+
+        self.keywords = {
+            intent: [normalize_query(keyword) for keyword in keywords]
+            for intent, keywords in data['keywords'].items()
+        }
+        self.topic_keywords = {
+            intent: {topic: [normalize_query(keyword) for keyword in keywords] for topic, keywords in topics.items()}
+            for intent, topics in data.get('topics', {}).items()
+        }
+        self.entries = [
+            {
+                'id': entry['id'],
+                'intent': entry['intent'],
+                'topic': entry['topic'],
+                'text': {language: '\n'.join(lines) for language, lines in entry['text'].items()},
+            }
+            for entry in data['guidance']
+        ]
+
+        self.matcher = self._build_matcher(data)
+        self.index, self.by_id = self._build_index(self.entries)
+
+    def _build_matcher(self, data):
+        """Compile every intent and topic keyword into one automaton"""
+        matcher = KeywordMatcher()
+        for intent, keywords in data['keywords'].items():
+            for keyword in keywords:
+                matcher.add(keyword, (intent, None))
+        for intent, topics in data.get('topics', {}).items():
+            for topic, keywords in topics.items():
+                for keyword in keywords:
+                    matcher.add(keyword, (intent, topic))
+        return matcher.build()
+
+    def _build_index(self, entries):
+        """Index guidance by (intent, topic, language), filling language fallbacks"""
+        index = {}
+        by_id = {}
+
+        for entry in entries:
+            texts = entry['text']
+            if self.default_language not in texts:
+                raise ValueError(f"Guidance {entry['id']} has no '{self.default_language}' text")
+
+            for language in self.languages:
+                text_language = language if language in texts else self.default_language
+                guidance = Guidance(
+                    entry['id'], entry['intent'], entry['topic'],
+                    language, texts[text_language], text_language
+                )
+                key = (entry['intent'], entry['topic'], language)
+                if key in index:
+                    raise ValueError(f"Duplicate guidance for {key}")
+                index[key] = guidance
+                by_id[guidance.id] = guidance
+
+        return index, by_id
+
+    def lookup(self, intent, topic, language):
+        """
+        Find guidance for an intent, sub-topic and language
+
+        Falls back to the intent's general topic and to the default language.
+
+        Returns:
+            Guidance
+        """
+        index = self.index
+        topic = topic or GENERAL_TOPIC
+        return (
+            index.get((intent, topic, language))
+            or index.get((intent, GENERAL_TOPIC, language))
+            or index.get((intent, topic, self.default_language))
+            or index[(intent, GENERAL_TOPIC, self.default_language)]
+        )
+
+
+class KnowledgeBase:
+    """
+    Loads the knowledge-base file and hot-reloads it when it changes
+
+    The current snapshot is swapped in with a single reference assignment,
+    so requests always see either the old or the new version, never a mix.
+    Workers notice file changes on their own (checked at most every
+    reload_interval seconds), so no restart is needed.
+    """
+
+    def __init__(self, path=DEFAULT_KNOWLEDGE_BASE, reload_interval=5.0):
+        """
+        Args:
+            path: Knowledge-base JSON file
+            reload_interval: Seconds between file change checks (0 disables)
+        """
+        self.path = Path(path)
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._mtime = None
+        self._snapshot = None
+        self.reload()
+
+    @property
+    def snapshot(self):
+        """Current compiled snapshot (checks the file for changes first)"""
+        if self.reload_interval and time.monotonic() >= self._next_check:
+            self._check_for_changes()
+        return self._snapshot
+
+    def reload(self):
+        """
+        Recompile the knowledge base from disk and swap it in
+
+        A file that fails to parse or compile is logged and ignored; the
+        previous snapshot keeps serving.
+
+        Returns:
+            True if a new snapshot was installed
+        """
+        with self._lock:
+            mtime = None
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                raw = self.path.read_bytes()
+                digest = hashlib.sha256(raw).hexdigest()
+                if self._snapshot is not None and digest == self._snapshot.digest:
+                    self._mtime = mtime
+                    return False
+
+                snapshot = KnowledgeSnapshot(json.loads(raw), digest)
+            except Exception as e:
+                if self._snapshot is None:
+                    raise
+                # Do not retry the same broken file on every check
+                self._mtime = mtime
+                logger.error(f"Knowledge base reload failed, keeping version {self._snapshot.version}: {e}")
+                return False
+
+            self._snapshot = snapshot
+            self._mtime = mtime
+            logger.info(f"Loaded knowledge base version {snapshot.version} ({digest[:12]})")
+            return True
+
+    def _check_for_changes(self):
+        self._next_check = time.monotonic() + self.reload_interval
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Could not stat knowledge base {self.path}: {e}")
+            return
+        if mtime != self._mtime:
+            self.reload()
@@ -0,0 +1,195 @@
+"""
+SaarthiAI production server
+Multi-worker launcher that builds shared state once in the master process
+so forked workers inherit it copy-on-write
+
+Usage (from the SaarthiVoice directory):
+    python serve.py
+"""
+
+import asyncio
+import gc
+import logging
+import os
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn_worker import UvicornWorker
+except ImportError:  # Optional dependency, falls back to uvicorn's own process manager
+    BaseApplication = None
+
+try:
+    import uvloop
+except ImportError:  # Optional dependency, the asyncio loop is used without it
+    uvloop = None
+
+try:
+    import httptools
+except ImportError:  # Optional dependency, h11 is used without it
+    httptools = None
+
+logger = logging.getLogger("saarthi.serve")
+
+
+def default_workers():
+    """One worker per CPU this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Server configuration
+BIND = os.environ.get("SAARTHI_BIND", "0.0.0.0:5000")
+WORKERS = int(os.environ.get("SAARTHI_WORKERS", "0")) or default_workers()
+# Workers are replaced after this many requests (0 disables recycling);
+# the jitter keeps them from all restarting at the same moment
+MAX_REQUESTS = int(os.environ.get("SAARTHI_MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.environ.get("SAARTHI_MAX_REQUESTS_JITTER", str(MAX_REQUESTS // 10)))
+# Seconds a stopping worker gets to finish in-flight requests
+GRACEFUL_TIMEOUT = int(os.environ.get("SAARTHI_GRACEFUL_TIMEOUT", "30"))
+KEEPALIVE = int(os.environ.get("SAARTHI_KEEPALIVE", "5"))
+# Vosk models are plain memory and safe to share; Piper voices run ONNX
+# Runtime thread pools that do not survive fork, so they load per worker
+PRELOAD_STT = os.environ.get("SAARTHI_PRELOAD_STT", "1") != "0"
+# Render all guidance audio into the shared audio store before forking
+# (hundreds of TTS calls on a cold store, so off unless asked for)
+PREFILL_SPEECH = os.environ.get("SAARTHI_PREFILL_SPEECH", "0") == "1"
+PREFILL_CONCURRENCY = int(os.environ.get("SAARTHI_PREFILL_CONCURRENCY", "4"))
+
+LOOP = "uvloop" if uvloop else "asyncio"
+HTTP = "httptools" if httptools else "h11"
+
+
+def prefill_speech(main):
+    """
+    Render every guidance entry, whole and in streaming chunks, in every
+    language into the shared audio store
+
+    The store outlives restarts, so only new or changed texts are rendered
+    after the first start. Speech goes through the same guarded engines as
+    requests (deadline, hedging, circuit breaker), at most
+    PREFILL_CONCURRENCY at a time. Texts that fail are skipped and rendered
+    on demand later.
+
+    Args:
+        main: The imported main module
+    """
+    helper = main.audio_helper
+    texts = []
+    for guidance in main.intent_engine.knowledge_base.snapshot.by_id.values():
+        texts.append((guidance.text, guidance.language))
+        texts.extend((chunk, guidance.language) for chunk in helper.split_for_speech(guidance.text))
+
+    async def render_all():
+        limit = asyncio.Semaphore(PREFILL_CONCURRENCY)
+
+        async def render(text, language):
+            async with limit:
+                await helper.speech_bytes_async(text, language)
+
+        try:
+            return await asyncio.gather(*(render(text, language) for text, language in texts),
+                                        return_exceptions=True)
+        finally:
+            # The clients belong to this loop; workers open their own
+            await main.upstream_pool.aclose()
+
+    results = asyncio.run(render_all())
+    # Stage pool threads must not be running (or holding locks) when the master forks
+    main.shutdown_executors(wait=True)
+
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        logger.warning(f"Could not prefill {len(failures)} of {len(texts)} guidance clips "
+                       f"(first error: {failures[0]}); they are rendered on demand")
+    logger.info(f"Guidance audio in the shared store: {len(texts) - len(failures)} clips "
+                f"({main.audio_store.size} bytes)")
+
+
+def preload(main):
+    """
+    Build the state every worker needs before the master forks
+
+    The app module has already built the knowledge-base index and the
+    intent engine on import; this adds the offline bundle, the cached and
+    prefilled guidance speech and (optionally) the STT models.
+
+    Args:
+        main: The imported main module
+    """
+    main.kb_bundles.current()
+    main.tts_cache.preload()
+    if PREFILL_SPEECH and main.audio_store is not None:
+        prefill_speech(main)
+    if PRELOAD_STT:
+        main.audio_helper.warm_up(tts=False)
+
+    # Move everything built so far out of the garbage collector's reach;
+    # otherwise its reference-count bookkeeping would write to (and so
+    # un-share) these pages in every worker
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded shared state ({gc.get_freeze_count()} objects frozen)")
+
+
+if BaseApplication is not None:
+
+    class SaarthiWorker(UvicornWorker):
+        """Uvicorn worker with the fastest event loop and HTTP parser installed"""
+
+        CONFIG_KWARGS = {"loop": LOOP, "http": HTTP}
+
+    class SaarthiServer(BaseApplication):
+        """Gunicorn application that imports the app once in the master"""
+
+        def load_config(self):
+            settings = {
+                "bind": BIND,
+                "workers": WORKERS,
+                "worker_class": SaarthiWorker,
+                "preload_app": True,
+                "max_requests": MAX_REQUESTS,
+                "max_requests_jitter": MAX_REQUESTS_JITTER,
+                "graceful_timeout": GRACEFUL_TIMEOUT,
+                "keepalive": KEEPALIVE,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            import main
+            preload(main)
+            return main.app
+
+
+def run():
+    """Start the production server"""
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Starting {WORKERS} workers on {BIND} (loop: {LOOP}, http: {HTTP})")
+
+    if BaseApplication is not None:
+        SaarthiServer().run()
+        return
+
+    # Without gunicorn each worker imports the app itself and only the audio
+    # store is shared, but recycling and graceful shutdown still work
+    import uvicorn
+
+    logger.warning("gunicorn is not installed; workers will not share preloaded state")
+    host, _, port = BIND.rpartition(":")
+    uvicorn.run(
+        "main:app",
+        host=host or "0.0.0.0",
+        port=int(port),
+        workers=WORKERS,
+        loop=LOOP,
+        http=HTTP,
+        limit_max_requests=MAX_REQUESTS or None,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        timeout_keep_alive=KEEPALIVE,
+        log_level="info",
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -7,6 +7,24 @@ let isRecording = false;
 let isOnline = true;
 const MAX_CACHED_RESPONSES = 5;
 
+// Voice session (WebSocket) state
+let voiceSocket = null;
+let pendingRecording = null;
+let sessionMediaType = 'audio/mpeg';
+const audioQueue = [];
+let audioQueuePlaying = false;
+const CHUNK_INTERVAL_MS = 250;
+
+// Offline knowledge base, stored in IndexedDB and matched on the device
+const KB_DB_NAME = 'saarthi';
+const KB_STORE = 'knowledge';
+const KB_BUNDLE_SCHEMA = 1;
+let knowledgeBase = null;
+
+// Word characters for matching: letters, combining marks (matras) and digits
+const WORD_CHAR = /[\p{L}\p{M}\p{N}]/u;
+const NON_WORD_RUN = /[^\p{L}\p{M}\p{N}]+/gu;
+
 // DOM elements
 const micButton = document.getElementById('mic-button');
 const chatContainer = document.getElementById('chat-container');
@@ -16,15 +34,22 @@ const statusText = document.getElementById('status-text');
 const recordingIndicator = document.getElementById('recording-indicator');
 const offlineNotice = document.getElementById('offline-notice');
 const audioPlayer = document.getElementById('audio-player');
+const textForm = document.getElementById('text-form');
+const textInput = document.getElementById('text-input');
+
+// Ask for Opus (several times smaller than MP3) when the browser can play it
+const AUDIO_FORMAT = audioPlayer.canPlayType('audio/ogg; codecs=opus') ? 'opus' : 'mp3';
+const AUDIO_EXTENSION = AUDIO_FORMAT === 'opus' ? 'ogg' : 'mp3';
 
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', () => {
     console.log('SaarthiAI initialized');
-    checkServerStatus();
+    checkServerStatus().then(syncKnowledgeBase);
     loadCachedResponses();
     
     // Set up mic button
     micButton.addEventListener('click', toggleRecording);
+    textForm.addEventListener('submit', submitTextQuery);
 });
 
 // Check server health status
@@ -46,8 +71,14 @@ async function checkServerStatus() {
 
 // Set online/offline status
 function setOnlineStatus(online) {
+    const reconnected = online && !isOnline;
     isOnline = online;
     
+    // Pick up knowledge-base changes made while we were offline
+    if (reconnected) {
+        syncKnowledgeBase();
+    }
+    
     if (online) {
         statusIndicator.className = 'status-online';
         statusText.textContent = 'Online';
@@ -74,26 +105,49 @@ async function startRecording() {
         // Request microphone access
         const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
         
+        // Stream audio over the voice session while recording, if it is available
+        let socket = null;
+        try {
+            socket = await openVoiceSession();
+        } catch (error) {
+            console.warn('Voice session unavailable, falling back to upload:', error);
+        }
+        
         // Create media recorder
         mediaRecorder = new MediaRecorder(stream);
         audioChunks = [];
         
-        // Collect audio chunks
+        if (socket) {
+            socket.send(JSON.stringify({ type: 'start', language: languageSelect.value, format: AUDIO_FORMAT }));
+            addMessage('user', 'Listening...');
+        }
+        
+        // Collect audio chunks (and send them right away over the session)
         mediaRecorder.ondataavailable = (event) => {
             audioChunks.push(event.data);
+            if (socket && socket.readyState === WebSocket.OPEN) {
+                socket.send(event.data);
+            }
         };
         
         // Handle recording stop
         mediaRecorder.onstop = async () => {
             const audioBlob = new Blob(audioChunks, { type: 'audio/wav' });
-            await processAudio(audioBlob);
             
             // Stop all tracks
             stream.getTracks().forEach(track => track.stop());
+            
+            if (socket && socket.readyState === WebSocket.OPEN) {
+                // Keep the recording until the answer arrives, in case the session drops
+                pendingRecording = audioBlob;
+                socket.send(JSON.stringify({ type: 'stop' }));
+            } else {
+                await processAudio(audioBlob);
+            }
         };
         
-        // Start recording
-        mediaRecorder.start();
+        // Start recording (emit chunks periodically when streaming)
+        mediaRecorder.start(socket ? CHUNK_INTERVAL_MS : undefined);
         isRecording = true;
         
         // Update UI
@@ -132,20 +186,25 @@ async function processAudio(audioBlob) {
     addMessage('user', 'Processing your voice...');
     
     try {
-        // Step 1: Transcribe audio to text
-        const transcribedText = await transcribeAudio(audioBlob, language);
+        // Transcribe, detect intent and render audio in a single request
+        const formData = new FormData();
+        formData.append('audio', audioBlob, 'recording.wav');
+        formData.append('language', language);
+        
+        const data = await askSaarthi(formData);
         
         // Update user message with transcribed text
-        updateLastUserMessage(transcribedText);
+        updateLastUserMessage(data.text);
         
-        // Step 2: Get response with audio
-        await getResponse(transcribedText, language);
+        await showAnswer(data, language);
         
     } catch (error) {
         console.error('Error processing audio:', error);
         
         // If offline, show cached responses
-        if (!isOnline) {
+        if (!isOnline && knowledgeBase) {
+            addMessage('bot', 'Voice questions need a connection. Type your question below to get the full answer offline.', 'general');
+        } else if (!isOnline) {
             showCachedResponses();
         } else {
             addMessage('bot', 'Sorry, there was an error processing your request. Please try again.', 'general');
@@ -153,70 +212,213 @@ async function processAudio(audioBlob) {
     }
 }
 
-// Transcribe audio to text
-async function transcribeAudio(audioBlob, language) {
-    const formData = new FormData();
-    formData.append('audio', audioBlob, 'recording.wav');
-    formData.append('language', language);
+// Open the voice session WebSocket, or reuse the open one
+function openVoiceSession() {
+    if (!('WebSocket' in window)) {
+        return Promise.reject(new Error('WebSocket not supported'));
+    }
+    if (voiceSocket && voiceSocket.readyState === WebSocket.OPEN) {
+        return Promise.resolve(voiceSocket);
+    }
     
-    const response = await fetch('/transcribe', {
-        method: 'POST',
-        body: formData
+    return new Promise((resolve, reject) => {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(`${protocol}//${window.location.host}/ws/session`);
+        socket.binaryType = 'blob';
+        
+        socket.onopen = () => {
+            voiceSocket = socket;
+            resolve(socket);
+        };
+        socket.onerror = () => reject(new Error('Could not open voice session'));
+        socket.onmessage = handleSessionMessage;
+        socket.onclose = () => {
+            if (voiceSocket === socket) {
+                voiceSocket = null;
+            }
+            // Session dropped before answering - send the recording the old way
+            if (pendingRecording) {
+                const audioBlob = pendingRecording;
+                pendingRecording = null;
+                processAudio(audioBlob);
+            }
+        };
     });
+}
+
+// Handle transcripts, guidance and audio arriving on the voice session
+function handleSessionMessage(event) {
+    // Binary frames are guidance audio, one playable clip each
+    if (typeof event.data !== 'string') {
+        queueAudio(new Blob([event.data], { type: sessionMediaType }));
+        return;
+    }
+    
+    const message = JSON.parse(event.data);
+    switch (message.type) {
+        case 'partial':
+            updateLastUserMessage(`${message.text}...`);
+            break;
+        case 'final':
+            updateLastUserMessage(message.text);
+            break;
+        case 'guidance':
+            pendingRecording = null;
+            sessionMediaType = message.audio_media_type;
+            clearAudioQueue();
+            showGuidance(message, message.language);
+            console.log('Server timing (ms):', message.timing);
+            break;
+        case 'audio_end':
+            break;
+        case 'error':
+            pendingRecording = null;
+            console.error('Voice session error:', message.detail);
+            addMessage('bot', 'Sorry, there was an error processing your request. Please try again.', 'general');
+            break;
+    }
+}
+
+// Send a query (text or recording) to the single-round-trip /ask endpoint
+async function askSaarthi(formData) {
+    formData.append('format', AUDIO_FORMAT);
+    
+    let response;
+    try {
+        response = await fetch('/ask', {
+            method: 'POST',
+            body: formData
+        });
+    } catch (error) {
+        setOnlineStatus(false);
+        throw error;
+    }
     
     if (!response.ok) {
-        throw new Error('Transcription failed');
+        throw new Error('Request failed');
     }
     
-    const data = await response.json();
-    return data.text;
+    return response.json();
 }
 
-// Get response from server
+// Get response from server for a text query
 async function getResponse(text, language) {
     const formData = new FormData();
     formData.append('text', text);
     formData.append('language', language);
     
-    try {
-        // First get the guidance text
-        const guidanceResponse = await fetch('/get-guidance', {
-            method: 'POST',
-            body: formData
-        });
-        
-        const guidanceData = await guidanceResponse.json();
-        
-        // Add bot message with guidance
-        addMessage('bot', guidanceData.guidance, guidanceData.intent);
-        
-        // Cache the response for offline use
-        cacheResponse({
-            text: text,
-            guidance: guidanceData.guidance,
-            intent: guidanceData.intent,
-            language: language,
-            timestamp: new Date().toISOString()
-        });
-        
-        // Get and play audio
-        const audioResponse = await fetch('/respond', {
-            method: 'POST',
-            body: formData
-        });
+    const data = await askSaarthi(formData);
+    await showAnswer(data, language);
+}
+
+// Show guidance, cache it and play its audio
+async function showAnswer(data, language) {
+    showGuidance(data, language);
+    
+    // Audio is already rendered on the server; fetch it right away
+    if (data.audio_url) {
+        await fetchAndPlay(data.audio_url);
+    }
+}
+
+// Fetch an audio URL (often straight from the browser cache) and play it
+async function fetchAndPlay(audioUrl) {
+    const audioResponse = await fetch(audioUrl);
+    
+    if (audioResponse.ok) {
+        const audioBlob = await audioResponse.blob();
+        playAudio(audioBlob);
+    }
+}
+
+// Answer a typed question, on the device when the knowledge base is stored
+async function submitTextQuery(event) {
+    event.preventDefault();
+    const text = textInput.value.trim();
+    if (!text) {
+        return;
+    }
+    textInput.value = '';
+    
+    const language = languageSelect.value;
+    addMessage('user', text);
+    
+    if (knowledgeBase) {
+        const data = answerLocally(text, language);
+        showGuidance(data, language);
         
-        if (audioResponse.ok) {
-            const audioBlob = await audioResponse.blob();
-            playAudio(audioBlob);
+        // Audio by guidance ID is cacheable, so repeats never reach the server
+        if (isOnline) {
+            fetchAndPlay(`/audio/${data.guidance_id}.${AUDIO_EXTENSION}`).catch(error => {
+                console.warn('Guidance audio unavailable:', error);
+            });
         }
-        
+        return;
+    }
+    
+    try {
+        await getResponse(text, language);
     } catch (error) {
         console.error('Error getting response:', error);
-        setOnlineStatus(false);
-        throw error;
+        if (!isOnline) {
+            showCachedResponses();
+        } else {
+            addMessage('bot', 'Sorry, there was an error processing your request. Please try again.', 'general');
+        }
     }
 }
 
+// Show guidance text and cache it for offline use
+function showGuidance(data, language) {
+    // Add bot message with guidance
+    addMessage('bot', data.guidance, data.intent);
+    
+    // Cache the response for offline use
+    cacheResponse({
+        text: data.text,
+        guidance: data.guidance,
+        intent: data.intent,
+        language: language,
+        timestamp: new Date().toISOString()
+    });
+}
+
+// Play audio clips one after another as they arrive
+function queueAudio(audioBlob) {
+    audioQueue.push(audioBlob);
+    if (!audioQueuePlaying) {
+        playNextInQueue();
+    }
+}
+
+function playNextInQueue() {
+    const audioBlob = audioQueue.shift();
+    if (!audioBlob) {
+        audioQueuePlaying = false;
+        return;
+    }
+    
+    audioQueuePlaying = true;
+    const audioUrl = URL.createObjectURL(audioBlob);
+    audioPlayer.src = audioUrl;
+    audioPlayer.onended = () => {
+        URL.revokeObjectURL(audioUrl);
+        playNextInQueue();
+    };
+    audioPlayer.play().catch(error => {
+        console.error('Playback error:', error);
+        URL.revokeObjectURL(audioUrl);
+        playNextInQueue();
+    });
+}
+
+// Stop playback of a previous answer
+function clearAudioQueue() {
+    audioQueue.length = 0;
+    audioQueuePlaying = false;
+    audioPlayer.pause();
+}
+
 // Play audio response
 function playAudio(audioBlob) {
     const audioUrl = URL.createObjectURL(audioBlob);
@@ -323,5 +525,204 @@ function showCachedResponses() {
     );
 }
 
+// Open the IndexedDB database holding the knowledge-base bundle
+function openKnowledgeStore() {
+    return new Promise((resolve, reject) => {
+        if (!('indexedDB' in window)) {
+            reject(new Error('IndexedDB not supported'));
+            return;
+        }
+        const request = indexedDB.open(KB_DB_NAME, 1);
+        request.onupgradeneeded = () => request.result.createObjectStore(KB_STORE);
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Read the stored bundle (null if there is none yet)
+async function readStoredBundle() {
+    const db = await openKnowledgeStore();
+    return new Promise((resolve, reject) => {
+        const request = db.transaction(KB_STORE).objectStore(KB_STORE).get('bundle');
+        request.onsuccess = () => resolve(request.result || null);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Replace the stored bundle
+async function storeBundle(bundle) {
+    const db = await openKnowledgeStore();
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction(KB_STORE, 'readwrite');
+        transaction.objectStore(KB_STORE).put(bundle, 'bundle');
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
+
+// Load the stored knowledge base, then bring it up to date from the server
+async function syncKnowledgeBase() {
+    let bundle = null;
+    try {
+        bundle = await readStoredBundle();
+        if (bundle && bundle.schema !== KB_BUNDLE_SCHEMA) {
+            bundle = null;
+        }
+        if (bundle && !knowledgeBase) {
+            knowledgeBase = compileKnowledgeBase(bundle);
+        }
+    } catch (error) {
+        console.warn('Stored knowledge base unavailable:', error);
+    }
+    
+    if (!isOnline) {
+        return;
+    }
+    
+    try {
+        // With a stored version the server sends only what changed (or 304)
+        const response = await fetch(bundle ? `/kb/bundle?since=${bundle.digest}` : '/kb/bundle');
+        if (response.status === 304) {
+            return;
+        }
+        if (!response.ok) {
+            throw new Error(`Bundle request failed: ${response.status}`);
+        }
+        
+        const update = await response.json();
+        bundle = update.type === 'delta' ? applyBundleDelta(bundle, update) : update;
+        knowledgeBase = compileKnowledgeBase(bundle);
+        await storeBundle(bundle);
+        console.log(`Knowledge base ${bundle.version} stored for offline use (${update.type})`);
+    } catch (error) {
+        console.warn('Could not update knowledge base:', error);
+    }
+}
+
+// Apply a delta from /kb/bundle to the stored bundle
+function applyBundleDelta(bundle, delta) {
+    if (!bundle || bundle.digest !== delta.base) {
+        throw new Error('Delta does not apply to the stored knowledge base');
+    }
+    
+    const entries = new Map(bundle.guidance.map(entry => [entry.id, entry]));
+    delta.guidance.remove.forEach(id => entries.delete(id));
+    delta.guidance.upsert.forEach(entry => entries.set(entry.id, entry));
+    
+    const updated = {
+        ...delta,
+        type: 'full',
+        keywords: mergeChanges(bundle.keywords, delta.keywords),
+        topics: mergeChanges(bundle.topics, delta.topics),
+        guidance: [...entries.values()]
+    };
+    delete updated.base;
+    return updated;
+}
+
+// Apply per-key replacements; null removes the key
+function mergeChanges(current, changes) {
+    const merged = { ...current };
+    for (const [key, value] of Object.entries(changes)) {
+        if (value === null) {
+            delete merged[key];
+        } else {
+            merged[key] = value;
+        }
+    }
+    return merged;
+}
+
+// Same canonical form as normalize_query on the server
+// (toLowerCase stands in for casefold; they agree for English, Hindi and Telugu)
+function normalizeQuery(text) {
+    return text.normalize('NFC').toLowerCase().normalize('NFC').replace(NON_WORD_RUN, ' ').trim();
+}
+
+// Build the keyword list and guidance index from a bundle
+function compileKnowledgeBase(bundle) {
+    const keywords = [];
+    const addKeyword = (keyword, label) => keywords.push([keyword, /^[\x00-\x7f]*$/.test(keyword), label]);
+    
+    for (const [intent, words] of Object.entries(bundle.keywords)) {
+        words.forEach(keyword => addKeyword(keyword, intent));
+    }
+    for (const [intent, topics] of Object.entries(bundle.topics)) {
+        topics.forEach(([topic, words]) => words.forEach(keyword => addKeyword(keyword, `${intent}/${topic}`)));
+    }
+    
+    // Guidance by intent, topic and language, with default-language fallbacks filled in
+    const index = new Map();
+    for (const entry of bundle.guidance) {
+        for (const language of bundle.languages) {
+            const text = entry.text[language] ?? entry.text[bundle.default_language];
+            index.set(`${entry.intent}/${entry.topic}/${language}`, { id: `${entry.id}.${language}`, text });
+        }
+    }
+    
+    return { bundle, keywords, index, suffixes: [''].concat(bundle.latin_suffixes) };
+}
+
+// Labels whose keywords occur as whole words (same rules as KeywordMatcher)
+function findKeywordLabels(kb, query) {
+    const labels = new Set();
+    for (const [keyword, latin, label] of kb.keywords) {
+        if (labels.has(label)) {
+            continue;
+        }
+        for (let start = query.indexOf(keyword); start !== -1; start = query.indexOf(keyword, start + 1)) {
+            if (isWholeWord(kb, query, start, start + keyword.length, latin)) {
+                labels.add(label);
+                break;
+            }
+        }
+    }
+    return labels;
+}
+
+function isWholeWord(kb, text, start, end, latin) {
+    if (start > 0 && WORD_CHAR.test(text[start - 1])) {
+        return false;
+    }
+    if (!latin) {
+        return true;
+    }
+    
+    // Latin keywords must end the word, allowing an English inflection
+    return kb.suffixes.some(suffix => {
+        const tail = end + suffix.length;
+        return text.startsWith(suffix, end) && (tail >= text.length || !WORD_CHAR.test(text[tail]));
+    });
+}
+
+// Detect intent and look up guidance on the device, like IntentEngine.get_guidance
+function answerLocally(text, language) {
+    const { bundle, index } = knowledgeBase;
+    const labels = findKeywordLabels(knowledgeBase, normalizeQuery(text));
+    
+    // When a query matches several intents, the first in priority order wins
+    const matched = bundle.intent_priority.find(intent => labels.has(intent));
+    const intent = matched || 'general';
+    let topic = bundle.general_topic;
+    if (matched) {
+        const topicMatch = (bundle.topics[intent] || []).find(([name]) => labels.has(`${intent}/${name}`));
+        topic = topicMatch ? topicMatch[0] : bundle.general_topic;
+    }
+    
+    const fallbackLanguage = bundle.default_language;
+    const guidance = index.get(`${intent}/${topic}/${language}`)
+        || index.get(`${intent}/${bundle.general_topic}/${language}`)
+        || index.get(`${intent}/${topic}/${fallbackLanguage}`)
+        || index.get(`${intent}/${bundle.general_topic}/${fallbackLanguage}`);
+    
+    return {
+        text: text,
+        intent: intent,
+        guidance: guidance.text,
+        guidance_id: guidance.id,
+        language: language
+    };
+}
+
 // Periodically check server status
 setInterval(checkServerStatus, 30000); // Check every 30 seconds
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from utils.resilience import CircuitBreaker, UpstreamError, UpstreamGuard
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def open_guard(clock):
+    guard = UpstreamGuard('tts', 'gtts', deadline=5, hedge=False, failure_threshold=1, reset_timeout=30)
+    guard.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    guard.breaker.record_failure()
+    return guard
+
+
+async def answer():
+    return b'audio'
+
+
+def test_cancelled_half_open_trial_lets_the_next_call_through():
+    clock = FakeClock()
+    guard = open_guard(clock)
+    clock.now = 31
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(60)
+
+        trial = asyncio.ensure_future(guard.call(slow))
+        await started.wait()
+        assert guard.breaker.state == CircuitBreaker.HALF_OPEN
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        return await guard.call(answer)
+
+    assert asyncio.run(scenario()) == b'audio'
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_rejects_until_reset_timeout():
+    clock = FakeClock()
+    guard = open_guard(clock)
+    with pytest.raises(UpstreamError) as error:
+        asyncio.run(guard.call(answer))
+    assert error.value.code == 'circuit_open'
+    assert error.value.retry_after == 30
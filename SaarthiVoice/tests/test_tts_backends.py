@@ -0,0 +1,40 @@
+import base64
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from gtts import gTTS, gTTSError
+
+from benchmarks.stub_upstreams import SILENT_MP3_FRAME, TTS_PATH, create_app
+from utils.tts_backends import GTTS_RPC, GTTSBackend, gtts_audio
+
+
+def test_gtts_requests_decode_against_the_stub():
+    backend = GTTSBackend(endpoint=TTS_PATH)
+    bodies = backend._request_bodies("First sentence. " * 20, 'hi')
+    assert len(bodies) > 1
+
+    with TestClient(create_app()) as stub:
+        for body in bodies:
+            response = stub.post(TTS_PATH, content=body, headers=gTTS.GOOGLE_TTS_HEADERS)
+            assert response.status_code == 200
+            audio = gtts_audio(response.text)
+            assert audio == SILENT_MP3_FRAME * max(1, len(body) // 8)
+
+
+def test_gtts_audio_reads_length_prefixed_responses():
+    parts = [b"ID3one", b"ID3two"]
+    lines = [")]}'", ""]
+    for part in parts:
+        entry = json.dumps([["wrb.fr", GTTS_RPC, json.dumps([base64.b64encode(part).decode()]), None, None, None, "generic"],
+                            ["di", 52]])
+        lines += [str(len(entry)), entry]
+    lines += ["25", '[["e",4,null,null,251]]']
+    assert gtts_audio("\n".join(lines)) == b"".join(parts)
+
+
+def test_gtts_audio_without_audio_raises():
+    with pytest.raises(gTTSError):
+        gtts_audio(')]}\'\n\n[["wrb.fr","jQ1olc",null,null,null,[3],"generic"]]')
+    with pytest.raises(gTTSError):
+        gtts_audio("<html>Sorry</html>")
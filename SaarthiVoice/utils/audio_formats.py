@@ -0,0 +1,165 @@
+"""
+Output audio formats for SaarthiAI
+Codec settings, ffmpeg transcoding and Accept-header negotiation for speech
+"""
+
+import subprocess
+
+from pydub import AudioSegment
+
+
+class AudioFormat:
+    """
+    One deliverable audio encoding
+
+    Attributes:
+        name: Format name used in parameters and cache keys (mp3, opus, wav)
+        media_type: Content-Type sent to clients
+        extension: File extension for downloads and audio URLs
+        muxer: ffmpeg output format
+        codec: ffmpeg audio encoder (None for the muxer default)
+        bitrates: Allowed bitrates in kbps (empty for uncompressed formats)
+        default_bitrate: Bitrate used when the client does not ask for one
+        aliases: Other media types in Accept headers that mean this format
+        concatenable: Whether encoded chunks can be joined into one stream
+    """
+
+    def __init__(self, name, media_type, extension, muxer, codec=None, bitrates=(),
+                 default_bitrate=None, aliases=(), concatenable=False, extra_args=()):
+        self.name = name
+        self.media_type = media_type
+        self.extension = extension
+        self.muxer = muxer
+        self.codec = codec
+        self.bitrates = tuple(bitrates)
+        self.default_bitrate = default_bitrate
+        self.aliases = tuple(aliases)
+        self.concatenable = concatenable
+        self.extra_args = list(extra_args)
+
+    def ffmpeg_args(self, bitrate=None):
+        """Encoder arguments for ffmpeg (mono output)"""
+        args = ['-ac', '1']
+        if self.codec:
+            args += ['-c:a', self.codec]
+        if bitrate:
+            args += ['-b:a', f'{bitrate}k']
+        return args + self.extra_args + ['-f', self.muxer]
+
+
+AUDIO_FORMATS = {
+    'mp3': AudioFormat(
+        'mp3', 'audio/mpeg', 'mp3', 'mp3', codec='libmp3lame',
+        bitrates=(24, 32, 48, 64), default_bitrate=32,  # gTTS speaks at 32 kbps
+        aliases=('audio/mp3', 'audio/mpeg3'),
+        concatenable=True  # MPEG frames can be appended to each other
+    ),
+    'opus': AudioFormat(
+        'opus', 'audio/ogg', 'ogg', 'ogg', codec='libopus',
+        bitrates=(12, 16, 24, 32), default_bitrate=24,
+        aliases=('audio/opus', 'audio/ogg; codecs=opus'),
+        # Tuned for speech at low bitrates
+        extra_args=('-application', 'voip')
+    ),
+    'wav': AudioFormat(
+        'wav', 'audio/wav', 'wav', 'wav',
+        aliases=('audio/x-wav', 'audio/wave', 'audio/vnd.wave')
+    ),
+}
+
+# Content-Type for each format name
+MEDIA_TYPES = {name: audio_format.media_type for name, audio_format in AUDIO_FORMATS.items()}
+
+# Format for an extension used in audio URLs (e.g. "ogg" -> "opus")
+FORMATS_BY_EXTENSION = {audio_format.extension: name for name, audio_format in AUDIO_FORMATS.items()}
+
+_FORMATS_BY_MEDIA_TYPE = {}
+for _name, _audio_format in AUDIO_FORMATS.items():
+    for _media_type in (_audio_format.media_type,) + _audio_format.aliases:
+        _FORMATS_BY_MEDIA_TYPE[_media_type.split(';')[0].strip()] = _name
+
+
+def transcode(audio_bytes, output_format, input_format=None, bitrate=None):
+    """
+    Convert encoded audio between formats with ffmpeg over pipes
+
+    Args:
+        audio_bytes: Encoded input audio
+        output_format: Target format name (mp3, opus or wav)
+        input_format: Input container, probed by ffmpeg when None
+        bitrate: Target bitrate in kbps (None for the format's default)
+
+    Returns:
+        Encoded output audio bytes
+    """
+    audio_format = AUDIO_FORMATS[output_format]
+    command = [AudioSegment.converter, '-hide_banner', '-loglevel', 'error']
+    if input_format:
+        command += ['-f', input_format]
+    command += ['-i', 'pipe:0'] + audio_format.ffmpeg_args(bitrate or audio_format.default_bitrate) + ['pipe:1']
+
+    result = subprocess.run(command, input=audio_bytes, capture_output=True)
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"Could not encode audio as {output_format}: {error}")
+    return result.stdout
+
+
+def _parse_accept(header):
+    """Yield (media type, quality, position) for each entry of an Accept header"""
+    for position, entry in enumerate(header.split(',')):
+        parts = [part.strip() for part in entry.split(';')]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        yield parts[0].lower(), quality, position
+
+
+def negotiate_format(accept=None, requested_format=None, requested_bitrate=None, default='mp3'):
+    """
+    Choose the audio format and bitrate for a response
+
+    An explicit format parameter wins over the Accept header. Among Accept
+    entries the highest quality supported format is used (earlier entries
+    win ties); wildcards and unknown types fall back to the default.
+
+    Args:
+        accept: Accept header value
+        requested_format: Format name or extension from a parameter
+        requested_bitrate: Bitrate in kbps from a parameter
+        default: Format used when nothing more specific was asked for
+
+    Returns:
+        (format name, requested bitrate in kbps or None for the default)
+
+    Raises:
+        ValueError: For an unknown format or unsupported bitrate
+    """
+    if requested_format:
+        name = requested_format.lower()
+        name = name if name in AUDIO_FORMATS else FORMATS_BY_EXTENSION.get(name)
+        if name is None:
+            raise ValueError(f"Unsupported audio format: {requested_format}")
+    else:
+        name = default
+        candidates = [
+            (quality, -position, _FORMATS_BY_MEDIA_TYPE[media_type])
+            for media_type, quality, position in _parse_accept(accept or '')
+            if quality > 0 and media_type in _FORMATS_BY_MEDIA_TYPE
+        ]
+        if candidates:
+            name = max(candidates)[2]
+
+    audio_format = AUDIO_FORMATS[name]
+    if requested_bitrate is None:
+        return name, None
+    if requested_bitrate not in audio_format.bitrates:
+        allowed = ', '.join(str(bitrate) for bitrate in audio_format.bitrates) or 'none'
+        raise ValueError(f"Unsupported bitrate for {name}: {requested_bitrate} (allowed: {allowed})")
+    return name, requested_bitrate
@@ -0,0 +1,128 @@
+"""
+Audio front end for SaarthiAI
+Vectorized noise-floor estimation, silence trimming and gain normalization
+applied to decoded PCM before speech recognition
+"""
+
+import numpy as np
+
+# Largest magnitude of a 16-bit sample
+FULL_SCALE = 32768.0
+
+
+class AudioFrontEnd:
+    """
+    Prepares decoded speech for recognition
+
+    The noise floor is estimated from the quietest frames of the whole
+    recording instead of assuming the first half second is silence, so no
+    speech is discarded. Leading and trailing silence is trimmed with an
+    energy VAD relative to that floor, and the remaining audio is scaled
+    to a fixed peak level. Nothing is shared between calls, so one instance
+    can serve every request thread.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=20, floor_percentile=10,
+                 speech_margin_db=10.0, min_threshold_dbfs=-55.0, max_threshold_dbfs=-35.0,
+                 min_speech_ms=60, padding_ms=200, target_peak_dbfs=-3.0, max_gain_db=20.0):
+        """
+        Args:
+            sample_rate: PCM sample rate
+            frame_ms: Analysis frame length
+            floor_percentile: Frame-energy percentile taken as the noise floor
+            speech_margin_db: How far above the floor a frame counts as speech
+            min_threshold_dbfs: Lowest allowed speech threshold (near-silent input)
+            max_threshold_dbfs: Highest allowed speech threshold (noisy input)
+            min_speech_ms: Shortest run of loud frames treated as speech (drops clicks)
+            padding_ms: Audio kept before and after the detected speech
+            target_peak_dbfs: Peak level after normalization
+            max_gain_db: Largest gain applied, so faint noise is not blown up
+        """
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.floor_percentile = floor_percentile
+        self.speech_margin_db = speech_margin_db
+        self.min_threshold_dbfs = min_threshold_dbfs
+        self.max_threshold_dbfs = max_threshold_dbfs
+        self.min_speech_frames = max(1, round(min_speech_ms / frame_ms))
+        self.padding_frames = round(padding_ms / frame_ms)
+        self.target_peak = FULL_SCALE * 10 ** (target_peak_dbfs / 20)
+        self.max_gain = 10 ** (max_gain_db / 20)
+
+    def frame_levels(self, samples):
+        """
+        RMS level of each frame in dBFS
+
+        Args:
+            samples: int16 sample array
+
+        Returns:
+            float array with one level per complete frame
+        """
+        frame_count = samples.size // self.frame_size
+        frames = samples[:frame_count * self.frame_size].reshape(frame_count, self.frame_size)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        return 20 * np.log10(np.maximum(rms, 1.0) / FULL_SCALE)
+
+    def speech_bounds(self, levels, threshold):
+        """
+        Find the first and last speech frame
+
+        Returns:
+            (start, end) frame indexes including padding, or None if no speech
+        """
+        loud = (levels > threshold).astype(np.int16)
+        # Position i is set when frames i .. i+min_speech_frames-1 are all loud
+        runs = np.convolve(loud, np.ones(self.min_speech_frames, dtype=np.int16), 'valid')
+        starts = np.flatnonzero(runs == self.min_speech_frames)
+        if starts.size == 0:
+            return None
+
+        start = max(0, int(starts[0]) - self.padding_frames)
+        end = min(levels.size, int(starts[-1]) + self.min_speech_frames + self.padding_frames)
+        return start, end
+
+    def process(self, pcm):
+        """
+        Trim silence and normalize a recording
+
+        Args:
+            pcm: Mono signed 16-bit little-endian PCM bytes
+
+        Returns:
+            (processed PCM bytes, dict describing what was done)
+        """
+        samples = np.frombuffer(pcm, dtype='<i2')
+        info = {'input_ms': round(samples.size * 1000 / self.sample_rate)}
+        if samples.size < self.frame_size * self.min_speech_frames:
+            info['speech'] = False
+            return pcm, info
+
+        levels = self.frame_levels(samples)
+        noise_floor = float(np.percentile(levels, self.floor_percentile))
+        threshold = min(max(noise_floor + self.speech_margin_db, self.min_threshold_dbfs), self.max_threshold_dbfs)
+        info['noise_floor_dbfs'] = round(noise_floor, 1)
+
+        bounds = self.speech_bounds(levels, threshold)
+        if bounds is None:
+            # Leave it to the recognizer to report that nothing was said
+            info['speech'] = False
+            return pcm, info
+
+        start, end = bounds
+        if end == levels.size:
+            end_sample = samples.size  # keep the partial last frame
+        else:
+            end_sample = end * self.frame_size
+        speech = samples[start * self.frame_size:end_sample]
+
+        peak = int(np.max(np.abs(speech.astype(np.int32))))
+        gain = min(self.target_peak / peak, self.max_gain) if peak else 1.0
+        output = np.clip(np.rint(speech * np.float32(gain)), -FULL_SCALE, FULL_SCALE - 1).astype('<i2')
+
+        info.update({
+            'speech': True,
+            'speech_ms': round(speech.size * 1000 / self.sample_rate),
+            'gain_db': round(20 * float(np.log10(gain)), 1),
+        })
+        return output.tobytes(), info
@@ -4,28 +4,320 @@ Handles speech-to-text and text-to-speech conversions
 """
 
 import speech_recognition as sr
-from gtts import gTTS
+import asyncio
 import os
+import re
+import subprocess
+import threading
+import wave
 from io import BytesIO
 import logging
 from pydub import AudioSegment
+from utils import metrics, tracing
+from utils.audio_formats import AUDIO_FORMATS, transcode
+from utils.audio_input import ChunkPipe, DecodeError, av, libav_decode, sniff_container, wav_to_pcm
+from utils.executors import run_in_stage
+from utils.resilience import UpstreamError
+from utils.audio_frontend import AudioFrontEnd
+from utils.stt_backends import GoogleSTTBackend
+from utils.tts_backends import GTTSBackend
 
 logger = logging.getLogger(__name__)
 
+# Recognizer input format: 16kHz mono 16-bit PCM
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+# Sentence ends in English (.!?) and Devanagari/Telugu text (danda)
+SENTENCE_END = re.compile(r'(?<=[.!?।॥])\s+')
+
+# Locks serializing transcodes of the same variant (picked by key hash)
+TRANSCODE_LOCK_STRIPES = 64
+
+# Containers that usually store their index after the audio (MP4/M4A: moov
+# after mdat), so they can only be demuxed once the whole file is there
+SEEKABLE_CONTAINERS = {'mp4'}
+
+
+def pcm_decode_command(container=None):
+    """
+    ffmpeg command that decodes audio on stdin to recognizer PCM on stdout
+    
+    Args:
+        container: Demuxer to use (from sniff_container); None lets ffmpeg probe
+    """
+    input_format = ['-f', container] if container else []
+    return [
+        AudioSegment.converter, '-hide_banner', '-loglevel', 'error',
+        *input_format, '-i', 'pipe:0',
+        '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE),
+        'pipe:1'
+    ]
+
+
+class StreamingDecoder:
+    """
+    Decodes audio that arrives in chunks while it is still being recorded
+    
+    One ffmpeg process runs per utterance. Encoded chunks are written to its
+    stdin as they arrive and PCM is collected from stdout on a reader
+    thread, so by the time the user stops speaking almost everything is
+    already decoded.
+    """
+    
+    def __init__(self):
+        self.process = subprocess.Popen(
+            pcm_decode_command(),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self.bytes_in = 0
+        self._container = None
+        self._pcm = bytearray()
+        self._stderr = bytearray()
+        # Drain both pipes so ffmpeg never blocks on a full buffer
+        self._readers = [
+            threading.Thread(target=self._drain, args=(self.process.stdout, self._pcm), daemon=True),
+            threading.Thread(target=self._drain, args=(self.process.stderr, self._stderr), daemon=True),
+        ]
+        for reader in self._readers:
+            reader.start()
+    
+    @staticmethod
+    def _drain(pipe, buffer):
+        while True:
+            data = pipe.read1(65536)
+            if not data:
+                return
+            buffer.extend(data)
+    
+    def _error(self):
+        return self._stderr.decode('utf-8', errors='replace').strip()
+    
+    def feed(self, chunk):
+        """Write the next encoded chunk (blocking; run on the decode pool)"""
+        if self.bytes_in == 0:
+            self._container = sniff_container(chunk)
+        try:
+            self.process.stdin.write(chunk)
+            self.process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            raise Exception(f"Could not convert audio format: {self._error() or 'decoder exited'}")
+        self.bytes_in += len(chunk)
+    
+    @property
+    def decoded_seconds(self):
+        """Duration of the audio decoded so far"""
+        return len(self._pcm) / (SAMPLE_RATE * SAMPLE_WIDTH)
+    
+    def pcm(self):
+        """PCM decoded so far (16kHz mono signed 16-bit)"""
+        return bytes(self._pcm)
+    
+    def finish(self):
+        """
+        Signal the end of the audio and wait for the remaining PCM
+        
+        Returns:
+            All decoded PCM bytes
+        """
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        for reader in self._readers:
+            reader.join()
+        if self.process.wait() != 0:
+            raise Exception(f"Could not convert audio format: {self._error()}")
+        
+        metrics.AUDIO_DECODES.inc(self._container or "unknown", "ffmpeg")
+        logger.info(f"Stream-decoded {self.bytes_in} bytes to {len(self._pcm)} bytes of PCM")
+        return bytes(self._pcm)
+    
+    def abort(self):
+        """Stop decoding and discard the audio"""
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+class LibavStreamingDecoder:
+    """
+    StreamingDecoder that decodes in process with libav (PyAV)
+    
+    Chunks are queued to a decoding thread instead of an ffmpeg process.
+    The thread starts with the first chunk, whose magic bytes name the
+    demuxer, and spends its time in libav with the GIL released. Containers
+    that need seeking (MP4) are buffered instead and decoded by finish().
+    """
+    
+    def __init__(self):
+        self.bytes_in = 0
+        self._container = None
+        self._pcm = bytearray()
+        self._pipe = ChunkPipe()
+        self._buffer = None
+        self._thread = None
+        self._error = None
+    
+    def _start(self, container):
+        self._container = container
+        if container in SEEKABLE_CONTAINERS:
+            self._buffer = bytearray()
+        else:
+            self._thread = threading.Thread(target=self._decode, args=(container,), daemon=True)
+            self._thread.start()
+    
+    def _decode(self, container):
+        try:
+            libav_decode(self._pipe, container, SAMPLE_RATE, output=self._pcm)
+        except Exception as e:
+            self._error = e
+        finally:
+            # Unblock feed() callers if the decoder stopped reading early
+            self._pipe.close(discard=True)
+    
+    def feed(self, chunk):
+        """Queue the next encoded chunk for decoding"""
+        if self._error is not None:
+            raise Exception(f"Could not convert audio format: {self._error}")
+        if self._thread is None and self._buffer is None:
+            self._start(sniff_container(chunk))
+        if self._buffer is not None:
+            self._buffer.extend(chunk)
+        else:
+            try:
+                self._pipe.write(chunk)
+            except ValueError:
+                raise Exception(f"Could not convert audio format: {self._error or 'decoder exited'}")
+        self.bytes_in += len(chunk)
+    
+    @property
+    def decoded_seconds(self):
+        """Duration of the audio decoded so far"""
+        return len(self._pcm) / (SAMPLE_RATE * SAMPLE_WIDTH)
+    
+    def pcm(self):
+        """PCM decoded so far (16kHz mono signed 16-bit)"""
+        return bytes(self._pcm)
+    
+    def finish(self):
+        """
+        Signal the end of the audio and wait for the remaining PCM
+        
+        Returns:
+            All decoded PCM bytes
+        """
+        if self._buffer is not None:
+            try:
+                libav_decode(self._buffer, self._container, SAMPLE_RATE, output=self._pcm)
+            except DecodeError as e:
+                raise Exception(f"Could not convert audio format: {e}")
+        else:
+            self._pipe.close()
+            if self._thread is not None:
+                self._thread.join()
+            if self._error is not None or self._thread is None:
+                raise Exception(f"Could not convert audio format: {self._error or 'no audio received'}")
+        
+        metrics.AUDIO_DECODES.inc(self._container or "unknown", "libav")
+        logger.info(f"Stream-decoded {self.bytes_in} bytes to {len(self._pcm)} bytes of PCM in process")
+        return bytes(self._pcm)
+    
+    def abort(self):
+        """Stop decoding and discard the audio"""
+        self._buffer = None
+        self._pipe.close(discard=True)
+        if self._thread is not None:
+            self._thread.join()
+
+
+def open_streaming_decoder():
+    """Streaming decoder for one utterance: in process with PyAV, else an ffmpeg process"""
+    if av is not None:
+        return LibavStreamingDecoder()
+    return StreamingDecoder()
+
+
 class AudioHelper:
     """
     Handles audio transcription and text-to-speech conversion
     """
     
-    def __init__(self):
+    def __init__(self, tts_cache=None, stt_backends=None, tts_backends=None, frontend=True,
+                 stt_fallback=None, tts_fallback=None):
+        """
+        Args:
+            tts_cache: Optional TTSCache for rendered speech
+            stt_backends: Optional dict of language code to STTBackend
+                (defaults to Google for every language)
+            tts_backends: Optional dict of language code to TTSBackend
+                (defaults to gTTS MP3 for every language)
+            frontend: AudioFrontEnd applied before recognition; True for
+                the default settings, None/False to send audio unchanged
+            stt_fallback: Optional STTBackend used when a language's engine
+                fails, times out or has its circuit open (async calls only)
+            tts_fallback: Optional TTSBackend used likewise; it must have
+                the same output format as the configured engines
+        """
+        self.tts_cache = tts_cache
         self.recognizer = sr.Recognizer()
-        # Adjust for ambient noise
-        self.recognizer.energy_threshold = 4000
-        self.recognizer.dynamic_energy_threshold = True
+        self.frontend = AudioFrontEnd(SAMPLE_RATE) if frontend is True else (frontend or None)
+        
+        self.default_stt_backend = GoogleSTTBackend(self.recognizer)
+        self.stt_backends = stt_backends or {}
+        
+        self.default_tts_backend = GTTSBackend()
+        self.tts_backends = tts_backends or {}
+        
+        self.stt_fallback = stt_fallback
+        self.tts_fallback = tts_fallback
+        
+        self._transcode_locks = [threading.Lock() for _ in range(TRANSCODE_LOCK_STRIPES)]
+    
+    def _run(self, coroutine):
+        """Run a coroutine on its own event loop, closing the upstream connections it opened"""
+        async def run():
+            try:
+                return await coroutine
+            finally:
+                backends = [
+                    self.default_stt_backend, self.default_tts_backend, self.stt_fallback, self.tts_fallback,
+                    *self.stt_backends.values(), *self.tts_backends.values()
+                ]
+                pools = {id(pool): pool for pool in (getattr(backend, 'pool', None) for backend in backends) if pool is not None}
+                for pool in pools.values():
+                    await pool.aclose()
+        return asyncio.run(run())
+    
+    def get_stt_backend(self, language):
+        """Return the speech recognition engine configured for a language"""
+        return self.stt_backends.get(language, self.default_stt_backend)
+    
+    def get_tts_backend(self, language):
+        """Return the speech synthesis engine configured for a language"""
+        return self.tts_backends.get(language, self.default_tts_backend)
+    
+    def warm_up(self, stt=True, tts=True):
+        """
+        Load STT models and TTS voices up front so the first request does not pay for it
+        
+        Args:
+            stt: Load speech recognition models
+            tts: Load speech synthesis voices
+        """
+        if stt:
+            for language, backend in self.stt_backends.items():
+                backend.warm_up([language])
+        if tts:
+            for language, backend in self.tts_backends.items():
+                backend.warm_up([language])
     
     def convert_to_wav(self, input_path, output_path):
         """
-        Convert audio file to WAV format using pydub
+        Convert audio file to 16kHz mono WAV
+        
+        The file is decoded once, in process for PCM WAV and by a single
+        ffmpeg run with the sniffed demuxer otherwise.
         
         Args:
             input_path: Path to input audio file (any format)
@@ -35,25 +327,14 @@ class AudioHelper:
             Path to converted WAV file
         """
         try:
-            # Detect file format from extension or try common formats
-            audio = None
-            try:
-                # Try as WebM (common browser format)
-                audio = AudioSegment.from_file(input_path, format="webm")
-            except:
-                try:
-                    # Try as generic audio file
-                    audio = AudioSegment.from_file(input_path)
-                except Exception as e:
-                    logger.error(f"Could not load audio file: {e}")
-                    raise
+            with open(input_path, 'rb') as f:
+                pcm = self.decode_to_pcm(f.read())
             
-            # Export as WAV with proper settings
-            audio.export(
-                output_path,
-                format="wav",
-                parameters=["-ar", "16000", "-ac", "1"]  # 16kHz mono
-            )
+            with wave.open(output_path, 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(SAMPLE_WIDTH)
+                wav.setframerate(SAMPLE_RATE)
+                wav.writeframes(pcm)
             
             logger.info(f"Converted audio to WAV: {output_path}")
             return output_path
@@ -62,30 +343,18 @@ class AudioHelper:
             logger.error(f"Error converting audio: {e}")
             raise
     
-    def transcribe_audio(self, audio_file_path, language='en'):
+    def load_audio(self, audio_file_path):
         """
-        Convert speech audio to text
+        Decode an uploaded audio file into recognizer input
         
         Args:
-            audio_file_path: Path to the audio file
-            language: Language code (en, hi, te)
+            audio_file_path: Path to the audio file (any format)
         
         Returns:
-            Transcribed text string
+            speech_recognition AudioData (16kHz mono)
         """
         wav_path = None
         try:
-            # Map language codes to Google Speech Recognition codes
-            lang_map = {
-                'en': 'en-US',
-                'hi': 'hi-IN',
-                'te': 'te-IN'
-            }
-            
-            google_lang = lang_map.get(language, 'en-US')
-            
-            logger.info(f"Transcribing file: {audio_file_path}, language: {language}")
-            
             # ALWAYS convert the audio file - browser may create fake .wav files
             # that are actually WebM or other formats
             wav_path = audio_file_path.replace(os.path.splitext(audio_file_path)[1], '_converted.wav')
@@ -102,77 +371,397 @@ class AudioHelper:
             
             # Load audio file
             logger.info(f"Loading audio file for recognition: {file_to_use}")
-            with sr.AudioFile(file_to_use) as source:
-                # Adjust for ambient noise
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                # Record the audio
+            return self._record(file_to_use)
+        
+        finally:
+            # Clean up converted WAV file
+            if wav_path and os.path.exists(wav_path):
+                try:
+                    os.unlink(wav_path)
+                    logger.info(f"Cleaned up temp WAV file: {wav_path}")
+                except Exception as e:
+                    logger.warning(f"Could not delete temp WAV file: {e}")
+    
+    def decode_to_pcm(self, audio_bytes):
+        """
+        Decode audio in any container to raw PCM entirely in memory
+        
+        The container is detected from the first bytes. Uncompressed WAV is
+        converted in process with NumPy and everything else with libav when
+        PyAV is installed. Without it the audio is streamed to one ffmpeg
+        process, told the demuxer up front, over stdin and PCM is read back
+        from stdout. Either way nothing touches the filesystem.
+        
+        Args:
+            audio_bytes: Encoded audio (WebM, Ogg, WAV, ...)
+        
+        Returns:
+            16kHz mono signed 16-bit little-endian PCM bytes
+        """
+        container = sniff_container(audio_bytes)
+        
+        if container == 'wav':
+            with tracing.stage("decode", input_bytes=len(audio_bytes), container=container, decoder="numpy"):
+                pcm = wav_to_pcm(audio_bytes, SAMPLE_RATE)
+            if pcm is not None:
+                metrics.AUDIO_DECODES.inc(container, "numpy")
+                logger.info(f"Decoded {len(audio_bytes)} bytes of WAV to {len(pcm)} bytes of PCM in process")
+                return pcm
+        
+        if av is not None:
+            with tracing.stage("decode", input_bytes=len(audio_bytes), container=container or "unknown", decoder="libav"):
+                try:
+                    pcm = libav_decode(audio_bytes, container, SAMPLE_RATE)
+                except DecodeError as e:
+                    raise Exception(f"Could not convert audio format: {e}")
+            metrics.AUDIO_DECODES.inc(container or "unknown", "libav")
+            logger.info(f"Decoded {len(audio_bytes)} bytes to {len(pcm)} bytes of PCM in process")
+            return bytes(pcm)
+        
+        with tracing.stage("decode", input_bytes=len(audio_bytes), container=container or "unknown", decoder="ffmpeg"):
+            result = subprocess.run(pcm_decode_command(container), input=audio_bytes, capture_output=True)
+        if result.returncode != 0:
+            error = result.stderr.decode('utf-8', errors='replace').strip()
+            raise Exception(f"Could not convert audio format: {error}")
+        
+        metrics.AUDIO_DECODES.inc(container or "unknown", "ffmpeg")
+        logger.info(f"Decoded {len(audio_bytes)} bytes to {len(result.stdout)} bytes of PCM")
+        return result.stdout
+    
+    def load_audio_bytes(self, audio_bytes):
+        """
+        Decode uploaded audio bytes into recognizer input without temp files
+        
+        Args:
+            audio_bytes: Encoded audio (any format)
+        
+        Returns:
+            speech_recognition AudioData (16kHz mono)
+        """
+        return self.prepare_pcm(self.decode_to_pcm(audio_bytes))
+    
+    def prepare_pcm(self, pcm):
+        """
+        Run the audio front end on decoded PCM and wrap it for recognition
+        
+        Silence is trimmed and gain normalized across the whole buffer, so
+        the start of the speech is kept and the shared recognizer is never
+        re-calibrated per request.
+        
+        Args:
+            pcm: 16kHz mono signed 16-bit PCM bytes
+        
+        Returns:
+            speech_recognition AudioData
+        """
+        if self.frontend:
+            with tracing.stage("preprocess", input_bytes=len(pcm)):
+                pcm, info = self.frontend.process(pcm)
+                for key, value in info.items():
+                    tracing.set_attribute(key, value)
+        
+        return sr.AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH)
+    
+    def _record(self, wav_source):
+        """Read a WAV file or file-like object into AudioData"""
+        with sr.AudioFile(wav_source) as source:
+            # Record the audio
+            with tracing.stage("record"):
                 audio_data = self.recognizer.record(source)
+        
+        pcm = audio_data.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH)
+        return self.prepare_pcm(pcm)
+    
+    async def recognize_async(self, audio_data, language='en'):
+        """
+        Recognize speech in decoded audio from the event loop
+        
+        Online engines use their pooled async client; the others run on the
+        STT stage pool. When the engine fails, the fallback engine (if any)
+        is tried before giving up.
+        
+        Args:
+            audio_data: speech_recognition AudioData
+            language: Language code (en, hi, te)
+        
+        Returns:
+            Transcribed text string (a notice when no speech was recognized)
+        
+        Raises:
+            UpstreamError: Neither the engine nor the fallback answered
+        """
+        backend = self.get_stt_backend(language)
+        try:
+            try:
+                text = await self._recognize_with(backend, audio_data, language)
+            except UpstreamError as e:
+                fallback = self.stt_fallback
+                if fallback is None or fallback is backend:
+                    raise
+                logger.warning(f"STT {e.code} on {backend.name}, falling back to {fallback.name}")
+                text = await self._recognize_with(fallback, audio_data, language)
+                metrics.UPSTREAM_FALLBACKS.inc("stt", fallback.name)
             
-            logger.info("Audio loaded successfully, sending to Google Speech Recognition")
-            
-            # Recognize speech using Google Speech Recognition
-            text = self.recognizer.recognize_google(
-                audio_data, 
-                language=google_lang
-            )
-            
+            metrics.TRANSCRIPTIONS.inc(language, "ok")
             logger.info(f"Transcribed text: {text}")
             return text
             
         except sr.UnknownValueError:
+            metrics.TRANSCRIPTIONS.inc(language, "no_speech")
             logger.error("Could not understand audio")
             return "Sorry, I could not understand the audio."
-        except sr.RequestError as e:
+        except UpstreamError:
+            metrics.TRANSCRIPTIONS.inc(language, "error")
+            raise
+    
+    async def _recognize_with(self, backend, audio_data, language):
+        """Recognize with one engine, reporting its failures as UpstreamError"""
+        logger.info(f"Recognizing speech with {backend.name} backend, language: {language}")
+        try:
+            with tracing.stage("stt", backend=backend.name, language=language):
+                return await backend.recognize_async(audio_data, language)
+        except (sr.RequestError, UpstreamError) as e:
+            metrics.UPSTREAM_ERRORS.inc("stt", backend.name)
             logger.error(f"Could not request results; {e}")
-            return "Sorry, there was an error processing your request."
-        except Exception as e:
-            logger.error(f"Error in transcription: {e}")
-            return f"Error: {str(e)}"
+            if isinstance(e, UpstreamError):
+                raise
+            raise UpstreamError("stt", "upstream_failed", backend.name, str(e)) from e
+    
+    def transcribe_audio(self, audio_file_path, language='en'):
+        """
+        Convert speech audio to text
         
-        finally:
-            # Clean up converted WAV file
-            if wav_path and os.path.exists(wav_path):
-                try:
-                    os.unlink(wav_path)
-                    logger.info(f"Cleaned up temp WAV file: {wav_path}")
-                except Exception as e:
-                    logger.warning(f"Could not delete temp WAV file: {e}")
+        Runs recognize_async() to completion, so it goes through the same
+        engine guards and fallback; not for use inside a running event loop.
+        
+        Args:
+            audio_file_path: Path to the audio file
+            language: Language code (en, hi, te)
+        
+        Returns:
+            Transcribed text string
+        
+        Raises:
+            Exception: The file could not be converted
+            UpstreamError: Neither the engine nor the fallback answered
+        """
+        logger.info(f"Transcribing file: {audio_file_path}, language: {language}")
+        audio_data = self.load_audio(audio_file_path)
+        return self._run(self.recognize_async(audio_data, language))
+    
+    def speech_variant(self, language, audio_format=None, bitrate=None):
+        """
+        Resolve a requested output encoding against the engine's own output
+        
+        Args:
+            language: Language code (en, hi, te)
+            audio_format: Format name (mp3, opus, wav), None for the engine's format
+            bitrate: Bitrate in kbps, None for the format's default
+        
+        Returns:
+            (format, bitrate) to transcode to, or None when the engine's
+            output can be served as is
+        """
+        output_format = self.get_tts_backend(language).output_format
+        audio_format = audio_format or output_format
+        default_bitrate = AUDIO_FORMATS[audio_format].default_bitrate
+        if audio_format == output_format and bitrate in (None, default_bitrate):
+            return None
+        return audio_format, bitrate or default_bitrate
+    
+    def tts_cache_key(self, text, language='en', audio_format=None, bitrate=None):
+        """
+        Content-addressed cache key for the speech of a text
+        
+        Args:
+            text: Text being spoken
+            language: Language code (en, hi, te)
+            audio_format: Output format, None for the engine's format
+            bitrate: Output bitrate in kbps, None for the format's default
+        
+        Returns:
+            Hex key, or None when caching is disabled
+        """
+        if not self.tts_cache:
+            return None
+        voice = self.get_tts_backend(language).voice_settings(language)
+        variant = self.speech_variant(language, audio_format, bitrate)
+        if variant:
+            voice['variant'] = f"{variant[0]}@{variant[1] or ''}"
+        return self.tts_cache.make_key(text, language, **voice)
     
     def text_to_speech(self, text, language='en'):
         """
         Convert text to speech audio
         
+        Runs speech_bytes_async() to completion, so it goes through the same
+        engine guards and fallback; not for use inside a running event loop.
+        
         Args:
             text: Text to convert
             language: Language code (en, hi, te)
         
         Returns:
-            BytesIO object containing MP3 audio data
+            BytesIO object containing audio data (MP3 unless configured otherwise)
+        
+        Raises:
+            UpstreamError: Neither the engine nor the fallback answered
+        """
+        return BytesIO(self._run(self.speech_bytes_async(text, language)))
+    
+    async def speech_bytes_async(self, text, language='en', audio_format=None, bitrate=None):
+        """
+        Encoded speech for a text, without copying cached audio
+        
+        The engine renders its configured format once (through the cache),
+        falling back to the fallback engine when it fails. Other formats and
+        bitrates are transcoded from that rendering on the TTS stage pool and
+        cached under their own key, so each text and variant pair is only
+        encoded once, even when requests for it arrive together.
+        
+        Args:
+            text: Text to convert
+            language: Language code (en, hi, te)
+            audio_format: Output format (mp3, opus, wav), None for the engine's format
+            bitrate: Output bitrate in kbps, None for the format's default
+        
+        Returns:
+            Audio bytes, or a read-only memoryview into the shared audio store
+        
+        Raises:
+            UpstreamError: Neither the engine nor the fallback answered
+        """
+        variant = self.speech_variant(language, audio_format, bitrate)
+        cache_key = self.tts_cache_key(text, language, *variant) if variant else None
+        if cache_key:
+            cached_audio = self.tts_cache.get(cache_key, AUDIO_FORMATS[variant[0]].extension)
+            if cached_audio is not None:
+                return cached_audio
+        
+        source, from_engine = await self._engine_speech_async(text, language)
+        if variant is None:
+            return source
+        if not cache_key or not from_engine:
+            # Fallback speech must not be cached under the engine's keys
+            return await run_in_stage("tts", self._transcode_speech, source, language, *variant)
+        return await run_in_stage("tts", self._cached_transcode, cache_key, source, language, *variant)
+    
+    async def _engine_speech_async(self, text, language):
+        """
+        Speech in the engine's own format, with the fallback engine
+        
+        Returns:
+            (audio, True) when it came from the configured engine (or its
+            cache entry), (audio, False) when it came from the fallback
+        
+        Raises:
+            UpstreamError: Neither the engine nor the fallback answered
         """
+        backend = self.get_tts_backend(language)
         try:
-            # Map language codes to gTTS codes
-            lang_map = {
-                'en': 'en',
-                'hi': 'hi',
-                'te': 'te'
-            }
-            
-            gtts_lang = lang_map.get(language, 'en')
-            
-            # Create text-to-speech object
-            tts = gTTS(text=text, lang=gtts_lang, slow=False)
-            
-            # Save to BytesIO object (in-memory file)
-            audio_buffer = BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
-            
-            logger.info(f"Generated speech for text: {text[:50]}...")
-            return audio_buffer
-            
+            audio_bytes = await self._synthesize_with(backend, text, language)
+            return audio_bytes, True
+        except UpstreamError as e:
+            fallback = self.tts_fallback
+            if fallback is None or fallback is backend:
+                raise
+            logger.warning(f"TTS {e.code} on {backend.name}, falling back to {fallback.name}")
+        
+        audio_bytes = await self._synthesize_with(fallback, text, language)
+        metrics.UPSTREAM_FALLBACKS.inc("tts", fallback.name)
+        return audio_bytes, False
+    
+    async def _synthesize_with(self, backend, text, language):
+        """Speech from one engine through its own cache entries, failures reported as UpstreamError"""
+        cache_key = None
+        extension = AUDIO_FORMATS[backend.output_format].extension
+        if self.tts_cache:
+            cache_key = self.tts_cache.make_key(text, language, **backend.voice_settings(language))
+            cached_audio = self.tts_cache.get(cache_key, extension)
+            if cached_audio is not None:
+                logger.info(f"TTS cache hit for text: {text[:50]}...")
+                return cached_audio
+        
+        try:
+            with tracing.stage("tts", backend=backend.name, language=language, chars=len(text)):
+                audio_bytes = await backend.synthesize_async(text, language)
         except Exception as e:
+            metrics.UPSTREAM_ERRORS.inc("tts", backend.name)
             logger.error(f"Error in text-to-speech: {e}")
-            raise
+            if isinstance(e, UpstreamError):
+                raise
+            raise UpstreamError("tts", "upstream_failed", backend.name, str(e)) from e
+        
+        if cache_key:
+            # Disk writes stay off the event loop
+            await run_in_stage("tts", self.tts_cache.put, cache_key, audio_bytes, extension)
+        
+        logger.info(f"Generated speech for text: {text[:50]}...")
+        return audio_bytes
+    
+    def _cached_transcode(self, cache_key, source, language, audio_format, bitrate):
+        """Transcode speech once per variant, through the cache (blocking)"""
+        extension = AUDIO_FORMATS[audio_format].extension
+        with self._transcode_locks[int(cache_key[:8], 16) % TRANSCODE_LOCK_STRIPES]:
+            # Another request may have encoded it while this one waited
+            cached_audio = self.tts_cache.get(cache_key, extension)
+            if cached_audio is not None:
+                return cached_audio
+            
+            audio_bytes = self._transcode_speech(source, language, audio_format, bitrate)
+            self.tts_cache.put(cache_key, audio_bytes, extension)
+        return audio_bytes
+    
+    def _transcode_speech(self, source, language, audio_format, bitrate):
+        """Encode speech in the engine's format as another variant"""
+        source_format = AUDIO_FORMATS[self.get_tts_backend(language).output_format]
+        
+        with tracing.stage("transcode", format=audio_format, bitrate=bitrate, input_bytes=len(source)):
+            audio_bytes = transcode(source, audio_format, source_format.muxer, bitrate)
+        
+        logger.info(f"Transcoded speech to {audio_format}: {len(source)} -> {len(audio_bytes)} bytes")
+        return audio_bytes
+    
+    def split_for_speech(self, text, max_chars=200):
+        """
+        Split guidance into chunks that can be synthesized one by one
+        
+        The first line (usually the title) becomes its own chunk so playback
+        can start quickly; following lines are grouped up to max_chars.
+        Lines longer than max_chars are split at sentence ends.
+        
+        Args:
+            text: Guidance text
+            max_chars: Target maximum chunk length
+        
+        Returns:
+            List of text chunks in reading order
+        """
+        pieces = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if len(line) <= max_chars:
+                pieces.append(line)
+            else:
+                pieces.extend(sentence for sentence in SENTENCE_END.split(line) if sentence)
+        
+        if not pieces:
+            return []
+        
+        chunks = [pieces[0]]
+        current = ''
+        for piece in pieces[1:]:
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+        if current:
+            chunks.append(current)
+        
+        return chunks
     
     def save_tts_to_file(self, text, output_path, language='en'):
         """
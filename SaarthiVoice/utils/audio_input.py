@@ -0,0 +1,305 @@
+"""
+Input audio containers for SaarthiAI
+Magic-byte detection of uploaded recordings and in-process decoders that
+turn them into recognizer input without starting ffmpeg: NumPy for PCM WAV,
+libav (PyAV) for compressed formats
+"""
+
+import io
+import struct
+import threading
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    import av
+except ImportError:  # Optional dependency, compressed audio is decoded by ffmpeg subprocesses without it
+    av = None
+
+# WAVE format tags decoded in process; anything else (u-law, ADPCM, ...) goes to ffmpeg
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Data chunk size written by recorders that do not know the length up front
+_UNKNOWN_SIZE = (0, 0xFFFFFFFF)
+
+# Taps of the anti-aliasing filter applied before downsampling
+RESAMPLE_TAPS = 63
+
+
+def sniff_container(data):
+    """
+    Identify the container of encoded audio from its first bytes
+
+    Browsers label recordings inconsistently (MediaRecorder WebM uploaded
+    as "recording.wav", Safari MP4 as "audio/webm"), so the bytes are
+    trusted rather than the file name or content type.
+
+    Args:
+        data: Encoded audio, or at least its first 12 bytes
+
+    Returns:
+        ffmpeg demuxer name (wav, webm, ogg, mp4, mp3, aac, flac, aiff,
+        caf, amr), or None when the format is not recognized
+    """
+    head = bytes(data[:12])
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'  # EBML: WebM and Matroska share one demuxer
+    if head[:4] == b'OggS':
+        return 'ogg'
+    if head[4:8] == b'ftyp':
+        return 'mp4'
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:4] == b'FORM' and head[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    if head[:4] == b'caff':
+        return 'caf'
+    if head[:5] == b'#!AMR':
+        return 'amr'
+    if head[:3] == b'ID3':
+        return 'mp3'
+    if len(head) >= 2 and head[0] == 0xFF:
+        # MPEG audio frame sync; layer bits 00 mark AAC in ADTS framing
+        if head[1] & 0xF6 == 0xF0:
+            return 'aac'
+        if head[1] & 0xE0 == 0xE0 and head[1] & 0x06:
+            return 'mp3'
+    return None
+
+
+def read_wav(data):
+    """
+    Samples of an uncompressed WAV file
+
+    Args:
+        data: WAV file bytes
+
+    Returns:
+        (samples, channels, sample_rate), samples being an interleaved
+        NumPy array in the file's own sample type, or None when the file
+        is compressed, truncated or otherwise needs ffmpeg
+    """
+    if len(data) < 12 or data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        return None
+
+    view = memoryview(data)
+    position = 12
+    fmt = None
+    while position + 8 <= len(data):
+        chunk_id = bytes(view[position:position + 4])
+        size, = struct.unpack_from('<I', data, position + 4)
+        body = position + 8
+
+        if chunk_id == b'fmt ' and size >= 16 and body + 16 <= len(data):
+            tag, channels, sample_rate, _, block_align, bits = struct.unpack_from('<HHIIHH', data, body)
+            if tag == WAVE_FORMAT_EXTENSIBLE and size >= 26 and body + 26 <= len(data):
+                # The sub-format GUID starts with the real format tag
+                tag, = struct.unpack_from('<H', data, body + 24)
+            fmt = (tag, channels, sample_rate, bits, block_align)
+
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            tag, channels, sample_rate, bits, block_align = fmt
+            dtype = _sample_type(tag, bits)
+            if dtype is None or not channels or not sample_rate or block_align != channels * bits // 8:
+                return None
+
+            end = len(data) if size in _UNKNOWN_SIZE else min(len(data), body + size)
+            end -= (end - body) % block_align
+            if bits == 24:
+                return _int24_samples(view[body:end]), channels, sample_rate
+            return np.frombuffer(view[body:end], dtype=dtype), channels, sample_rate
+
+        position = body + size + (size & 1)
+    return None
+
+
+def _sample_type(tag, bits):
+    if tag == WAVE_FORMAT_PCM:
+        return {8: np.uint8, 16: np.dtype('<i2'), 24: np.int32, 32: np.dtype('<i4')}.get(bits)
+    if tag == WAVE_FORMAT_IEEE_FLOAT:
+        return {32: np.dtype('<f4'), 64: np.dtype('<f8')}.get(bits)
+    return None
+
+
+def _int24_samples(raw):
+    """Packed little-endian 24-bit samples as int32 (scaled to the 32-bit range)"""
+    triples = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+    return (triples[:, 0] << 8) | (triples[:, 1] << 16) | (triples[:, 2] << 24)
+
+
+def to_float(samples):
+    """Samples of any WAV sample type as float32 in [-1, 1)"""
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128) / 128
+    if samples.dtype.kind == 'f':
+        return samples.astype(np.float32, copy=False)
+    return samples.astype(np.float32) / float(2 ** (8 * samples.dtype.itemsize - 1))
+
+
+@lru_cache(maxsize=16)
+def _lowpass(cutoff):
+    """Windowed-sinc low-pass kernel; cutoff as a fraction of the input Nyquist frequency"""
+    taps = np.arange(RESAMPLE_TAPS) - (RESAMPLE_TAPS - 1) / 2
+    kernel = cutoff * np.sinc(cutoff * taps) * np.hamming(RESAMPLE_TAPS)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(samples, rate, target_rate):
+    """
+    Resample mono float audio
+
+    Downsampling filters out everything above the new Nyquist frequency
+    first, so e.g. 48 kHz recordings do not alias into the speech band.
+
+    Args:
+        samples: float32 mono samples
+        rate: Their sample rate
+        target_rate: Wanted sample rate
+
+    Returns:
+        float32 samples at target_rate
+    """
+    if rate == target_rate or not len(samples):
+        return samples
+    if rate > target_rate:
+        samples = np.convolve(samples, _lowpass(target_rate / rate), mode='same')
+
+    count = int(len(samples) * target_rate / rate)
+    positions = np.arange(count, dtype=np.float64) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def wav_to_pcm(data, sample_rate=16000):
+    """
+    Decode an uncompressed WAV file to recognizer PCM in process
+
+    16-bit mono files at the target rate are passed through without any
+    conversion; others are downmixed and resampled with NumPy.
+
+    Args:
+        data: WAV file bytes
+        sample_rate: Output sample rate
+
+    Returns:
+        Mono signed 16-bit little-endian PCM bytes, or None when the file
+        has to be decoded by ffmpeg
+    """
+    wav = read_wav(data)
+    if wav is None:
+        return None
+    samples, channels, rate = wav
+
+    if channels == 1 and rate == sample_rate and samples.dtype == np.dtype('<i2'):
+        return samples.tobytes()
+
+    audio = to_float(samples)
+    if channels > 1:
+        audio = audio[:len(audio) - len(audio) % channels].reshape(-1, channels).mean(axis=1)
+    audio = resample(audio, rate, sample_rate)
+    return np.clip(np.rint(audio * 32768), -32768, 32767).astype('<i2').tobytes()
+
+
+class DecodeError(Exception):
+    """Audio that libav could not demux or decode"""
+
+
+def libav_decode(source, container=None, sample_rate=16000, output=None):
+    """
+    Decode compressed audio (WebM/Opus, Ogg, MP4/AAC, ...) to recognizer PCM in process
+
+    Demuxing and decoding run inside libav with the GIL released, so
+    uploads decode in parallel on the decode pool's threads. Frames are
+    converted by libswresample; a resampler is set up once per decode and
+    reused for every frame with the same input format.
+
+    Args:
+        source: Encoded audio bytes, or a binary file object to read it from
+        container: Demuxer name from sniff_container; None lets libav probe
+        sample_rate: Output sample rate
+        output: bytearray the PCM is appended to as soon as it is decoded,
+            so other threads can read what has been decoded so far
+
+    Returns:
+        Mono signed 16-bit little-endian PCM (the output bytearray)
+
+    Raises:
+        DecodeError: The audio could not be demuxed or decoded
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    pcm = bytearray() if output is None else output
+    resampler = None
+    input_format = None
+
+    def emit(frames):
+        for frame in frames:
+            pcm.extend(frame.to_ndarray().tobytes())
+
+    try:
+        with av.open(source, mode='r', format=container) as media:
+            if not media.streams.audio:
+                raise DecodeError("no audio stream")
+            for frame in media.decode(media.streams.audio[0]):
+                frame_format = (frame.format.name, frame.layout.name, frame.sample_rate)
+                if frame_format != input_format:
+                    # Chained Ogg streams and some AAC files change format mid-stream
+                    if resampler is not None:
+                        emit(resampler.resample(None))
+                    resampler = av.AudioResampler(format='s16', layout='mono', rate=sample_rate)
+                    input_format = frame_format
+                emit(resampler.resample(frame))
+            if resampler is not None:
+                emit(resampler.resample(None))
+    except (av.FFmpegError, ValueError) as e:
+        raise DecodeError(str(e)) from e
+    return pcm
+
+
+class ChunkPipe:
+    """
+    Blocking file object fed with chunks by another thread
+
+    libav reads from it on the decoding thread while chunks of a recording
+    are still arriving; read() waits for data until the pipe is closed.
+    """
+
+    def __init__(self):
+        self._chunks = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def write(self, chunk):
+        with self._condition:
+            if self._closed:
+                raise ValueError("write to closed pipe")
+            self._chunks.append(bytes(chunk))
+            self._condition.notify()
+
+    def close(self, discard=False):
+        """Signal the end of the data (discard drops what has not been read yet)"""
+        with self._condition:
+            self._closed = True
+            if discard:
+                self._chunks.clear()
+            self._condition.notify()
+
+    def read(self, size=-1):
+        with self._condition:
+            while not self._chunks and not self._closed:
+                self._condition.wait()
+            if not self._chunks:
+                return b''
+            chunk = self._chunks.popleft()
+            if 0 <= size < len(chunk):
+                self._chunks.appendleft(chunk[size:])
+                chunk = chunk[:size]
+            return chunk
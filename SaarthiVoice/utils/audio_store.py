@@ -0,0 +1,230 @@
+"""
+Shared audio store for SaarthiAI
+Append-only segment file plus index, memory-mapped by every worker process
+so rendered speech sits in RAM once per node instead of once per worker
+"""
+
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where the store is disabled
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Whether this platform has the file locks the store needs
+SUPPORTED = fcntl is not None
+
+# Index record: raw SHA-256 key, offset and length in the segment file
+_RECORD = struct.Struct("<32sQI")
+
+# Key of the record that closes a generation; readers move to the next one
+_SEALED = b"\xff" * 32
+
+_GENERATION_FILE = re.compile(r"gen-(\d+)\.index")
+
+
+class SharedAudioStore:
+    """
+    Read-mostly audio shared between processes through the page cache
+
+    Audio is appended to a segment file and its location to an index file;
+    bytes already written never change, so readers can hand out views into
+    their mapping without locks or copies. Writers serialize on a file lock.
+    When the segment reaches max_bytes the writer seals it and starts a new
+    generation; entries are then added again as they are requested, and
+    processes still holding views of the old segment keep their mapping.
+    """
+
+    def __init__(self, directory="audio_store", max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            directory: Directory holding the segment and index files
+            max_bytes: Segment size at which a new generation is started
+        """
+        if not SUPPORTED:
+            raise RuntimeError("The shared audio store needs POSIX file locks")
+
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._open(max(self._generations(), default=0))
+
+    def __len__(self):
+        with self._lock:
+            self._catch_up()
+            return len(self._entries)
+
+    @property
+    def size(self):
+        """Bytes used by the current generation"""
+        with self._lock:
+            self._catch_up()
+            return self._data_size
+
+    def get(self, key):
+        """
+        Look up audio by its hex cache key
+
+        Returns:
+            Read-only memoryview of the audio, or None if it is not stored
+        """
+        with self._lock:
+            self._ensure_process()
+            location = self._entries.get(key)
+            if location is None:
+                self._catch_up()
+                location = self._entries.get(key)
+                if location is None:
+                    return None
+
+            offset, length = location
+            if self._map is None or offset + length > len(self._map):
+                self._remap()
+            return memoryview(self._map)[offset:offset + length]
+
+    def put(self, key, data):
+        """
+        Append audio unless another process already stored it
+
+        Returns:
+            True if the audio is stored (now or before), False if it does not fit
+        """
+        if len(data) > self.max_bytes:
+            return False
+
+        with self._lock:
+            self._ensure_process()
+            while True:
+                generation = self.generation
+                fcntl.flock(self._data_fd, fcntl.LOCK_EX)
+                try:
+                    self._catch_up()
+                    if self.generation != generation:
+                        continue  # Another process started a new generation
+                    if key in self._entries:
+                        return True
+
+                    offset = os.fstat(self._data_fd).st_size
+                    if offset + len(data) > self.max_bytes:
+                        self._seal()
+                        continue
+
+                    self._write(self._data_fd, data)
+                    # The index record goes last, so readers never see audio
+                    # that is not completely written
+                    self._write(self._index_fd, _RECORD.pack(bytes.fromhex(key), offset, len(data)))
+                    self._entries[key] = (offset, len(data))
+                    self._data_size = offset + len(data)
+                    self._index_position += _RECORD.size
+                    return True
+                finally:
+                    # Switching generations closes the locked file, which unlocks it
+                    if self.generation == generation:
+                        fcntl.flock(self._data_fd, fcntl.LOCK_UN)
+
+    def _generations(self):
+        """Generation numbers present on disk"""
+        return [
+            int(match.group(1))
+            for match in map(_GENERATION_FILE.fullmatch, os.listdir(self.directory))
+            if match
+        ]
+
+    def _paths(self, generation):
+        return (
+            self.directory / f"gen-{generation}.data",
+            self.directory / f"gen-{generation}.index",
+        )
+
+    def _open(self, generation):
+        """Switch to a generation, creating its files if needed (lock held)"""
+        self._close()
+        self.generation = generation
+        self._open_files()
+
+        # Views handed out earlier keep the previous mapping alive
+        self._map = None
+        self._entries = {}
+        self._data_size = 0
+        self._index_position = 0
+        self._catch_up()
+
+    def _open_files(self):
+        data_path, index_path = self._paths(self.generation)
+        flags = os.O_RDWR | os.O_CREAT | os.O_APPEND
+        self._data_fd = os.open(data_path, flags, 0o644)
+        self._index_fd = os.open(index_path, flags, 0o644)
+        self._pid = os.getpid()
+
+    def _close(self):
+        for name in ("_data_fd", "_index_fd"):
+            fd = getattr(self, name, None)
+            if fd is not None:
+                os.close(fd)
+                setattr(self, name, None)
+
+    def _ensure_process(self):
+        """
+        Reopen the files after a fork (lock held)
+
+        File locks belong to the open file, so a worker using descriptors
+        inherited from the master would not be excluded by its siblings.
+        The mapping itself can be shared.
+        """
+        if self._pid != os.getpid():
+            self._close()
+            self._open_files()
+
+    def _catch_up(self):
+        """Read index records appended by other processes (lock held)"""
+        self._ensure_process()
+        size = os.fstat(self._index_fd).st_size
+        end = size - (size - self._index_position) % _RECORD.size
+        if end <= self._index_position:
+            return
+
+        records = os.pread(self._index_fd, end - self._index_position, self._index_position)
+        self._index_position = end
+        for key, offset, length in _RECORD.iter_unpack(records):
+            if key == _SEALED:
+                # Several generations may have been sealed since; skip to the newest
+                self._open(max(self._generations()))
+                return
+            self._entries[key.hex()] = (offset, length)
+            self._data_size = max(self._data_size, offset + length)
+
+    def _seal(self):
+        """Close the current generation and drop older ones (file lock held)"""
+        # The next generation exists before any reader learns of it
+        for path in self._paths(self.generation + 1):
+            path.touch()
+        self._write(self._index_fd, _RECORD.pack(_SEALED, 0, 0))
+
+        # Mapped pages stay readable for processes still using them
+        for generation in self._generations():
+            if generation < self.generation:
+                for path in self._paths(generation):
+                    path.unlink(missing_ok=True)
+        logger.info(f"Audio store generation {self.generation} is full, starting {self.generation + 1}")
+        self._open(self.generation + 1)
+
+    def _remap(self):
+        """Map the segment file at its current size (lock held)"""
+        self._map = mmap.mmap(self._data_fd, 0, access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def _write(fd, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
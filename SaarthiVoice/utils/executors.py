@@ -0,0 +1,102 @@
+"""
+Bounded thread pools for blocking audio work in SaarthiAI
+Each pipeline stage gets its own pool so a slow stage cannot starve the others
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Default pool size per stage, overridable with SAARTHI_<STAGE>_WORKERS
+STAGE_WORKERS = {
+    'decode': 4,    # libav / ffmpeg conversion
+    'stt': 8,       # speech recognition (network bound)
+    'tts': 8,       # speech synthesis (network bound)
+}
+
+_executors = {}
+_owner_pid = None
+_lock = threading.Lock()
+
+
+def stage_workers(stage):
+    """Return the configured pool size for a stage"""
+    default = STAGE_WORKERS.get(stage, 4)
+    return int(os.environ.get(f"SAARTHI_{stage.upper()}_WORKERS", default))
+
+
+def get_executor(stage):
+    """
+    Get the thread pool for a pipeline stage, creating it on first use
+
+    Pools are created lazily and per process, so a server that forks
+    workers never inherits pool threads from its parent.
+
+    Args:
+        stage: Stage name (decode, stt, tts)
+
+    Returns:
+        ThreadPoolExecutor for the stage
+    """
+    global _owner_pid
+
+    with _lock:
+        if _owner_pid != os.getpid():
+            _executors.clear()
+            _owner_pid = os.getpid()
+
+        executor = _executors.get(stage)
+        if executor is None:
+            workers = stage_workers(stage)
+            executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix=f"saarthi-{stage}"
+            )
+            _executors[stage] = executor
+            logger.info(f"Started {stage} pool with {workers} workers")
+        return executor
+
+
+async def run_in_stage(stage, func, *args, **kwargs):
+    """
+    Run a blocking function on a stage pool without blocking the event loop
+
+    Args:
+        stage: Stage name (decode, stt, tts)
+        func: Blocking callable
+        *args, **kwargs: Arguments for func
+
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    # Carry context variables (request-scoped state) into the worker thread
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(stage), call)
+
+
+def shutdown_executors(wait=False):
+    """
+    Stop all stage pools owned by this process
+
+    Queued work is cancelled.
+
+    Args:
+        wait: Block until the running work is done and the pool threads
+            have exited (e.g. before forking)
+    """
+    with _lock:
+        if _owner_pid != os.getpid():
+            return
+        executors = list(_executors.values())
+        _executors.clear()
+    # Joined outside the lock: finishing work may still look up a pool
+    for executor in executors:
+        executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,306 @@
+"""
+Process metrics for SaarthiAI
+Counters, gauges and histograms rendered in the Prometheus text format
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Latency buckets (seconds) covering ffmpeg, network STT/TTS and intent lookup
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Registry:
+    """Collection of metrics exposed together on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def reset(self):
+        """Drop all recorded values (used after fork so workers start at zero)"""
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    """
+    Base class for metrics recorded into per-thread shards
+
+    Every thread writes only to its own shard (a plain dict keyed by label
+    values), so recording never takes a lock and threads never contend.
+    Scraping merges the shards; a value written during a scrape shows up in
+    the next one. The only lock is taken once per thread, when it records
+    its first value.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+        if registry is not None:
+            registry.register(self)
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _snapshots(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy() runs without releasing the GIL, so it never sees a resize
+        return [shard.copy() for shard in shards]
+
+    def reset(self):
+        with self._shards_lock:
+            self._shards = []
+            self._local = threading.local()
+
+    def samples(self):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def totals(self):
+        totals = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def samples(self):
+        for labels, value in sorted(self.totals().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. work currently in flight"""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            # One slot per bucket, one for +Inf, and the running sum
+            counts = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def time(self, *labels):
+        """Context manager that observes the time spent in its block"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        merged = {}
+        for shard in self._snapshots():
+            for labels, counts in shard.items():
+                counts = list(counts)
+                total = merged.get(labels)
+                merged[labels] = counts if total is None else [a + b for a, b in zip(total, counts)]
+
+        for labels, counts in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                label_text = _format_labels(self.labelnames, labels, f'le="{le}"')
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(counts[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Callback(Metric):
+    """
+    Metric read from a function at scrape time
+
+    For values another component already tracks (e.g. cache statistics),
+    so nothing extra is recorded on the request path.
+    """
+
+    def __init__(self, name, documentation, kind, function, labelnames=(), registry=REGISTRY):
+        """
+        Args:
+            kind: "counter" or "gauge"
+            function: Returns a dict mapping label-value tuples to numbers
+        """
+        self.kind = kind
+        self.function = function
+        super().__init__(name, documentation, labelnames, registry)
+
+    def samples(self):
+        for labels, value in sorted(self.function().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'gauge', 'started')
+
+    def __init__(self, histogram, labels, gauge=None):
+        self.histogram = histogram
+        self.labels = labels
+        self.gauge = gauge
+
+    def __enter__(self):
+        if self.gauge is not None:
+            self.gauge.inc(*self.labels)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        if self.gauge is not None:
+            self.gauge.dec(*self.labels)
+
+
+# Voice pipeline metrics
+STAGE_SECONDS = Histogram(
+    "saarthi_stage_duration_seconds",
+    "Time spent in each voice pipeline stage",
+    ("stage",)
+)
+STAGE_IN_FLIGHT = Gauge(
+    "saarthi_stage_in_flight",
+    "Pipeline stage calls currently running",
+    ("stage",)
+)
+HTTP_REQUESTS = Counter(
+    "saarthi_http_requests_total",
+    "HTTP requests handled",
+    ("method", "route", "status")
+)
+HTTP_SECONDS = Histogram(
+    "saarthi_http_request_duration_seconds",
+    "Time until response headers were sent",
+    ("method", "route")
+)
+HTTP_IN_FLIGHT = Gauge(
+    "saarthi_http_requests_in_flight",
+    "HTTP requests currently being handled"
+)
+WS_SESSIONS = Gauge(
+    "saarthi_ws_sessions",
+    "Open /ws/session voice connections"
+)
+INTENTS = Counter(
+    "saarthi_intents_total",
+    "Detected intents by language",
+    ("intent", "language")
+)
+TRANSCRIPTIONS = Counter(
+    "saarthi_transcriptions_total",
+    "Speech recognition results by language",
+    ("language", "result")
+)
+UPSTREAM_ERRORS = Counter(
+    "saarthi_upstream_errors_total",
+    "Failed calls to speech recognition and synthesis engines",
+    ("service", "backend")
+)
+UPSTREAM_HEDGES = Counter(
+    "saarthi_upstream_hedged_requests_total",
+    "Duplicate requests sent to slow engines, by whether the duplicate answered first",
+    ("service", "backend", "outcome")
+)
+UPSTREAM_REJECTED = Counter(
+    "saarthi_upstream_rejected_total",
+    "Calls failed fast because the engine's circuit breaker was open",
+    ("service", "backend")
+)
+UPSTREAM_FALLBACKS = Counter(
+    "saarthi_upstream_fallbacks_total",
+    "Requests answered by the fallback engine after the primary one failed",
+    ("service", "backend")
+)
+AUDIO_DECODES = Counter(
+    "saarthi_audio_decodes_total",
+    "Uploaded recordings decoded, by detected container and decoder",
+    ("container", "decoder")
+)
+TTS_CACHE_REQUESTS = Counter(
+    "saarthi_tts_cache_requests_total",
+    "TTS cache lookups by result",
+    ("result",)
+)
+
+
+def stage_timer(stage):
+    """
+    Time a pipeline stage and count it as in flight while it runs
+
+    Usage:
+        with stage_timer("decode"):
+            pcm = decode(...)
+    """
+    return _Timer(STAGE_SECONDS, (stage,), STAGE_IN_FLIGHT)
+
+
+# A forked worker must not report its parent's numbers
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=REGISTRY.reset)
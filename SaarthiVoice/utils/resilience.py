@@ -0,0 +1,376 @@
+"""
+Resilience for SaarthiAI's online speech engines
+Per-request deadlines, hedged requests and circuit breakers around the
+Google STT and gTTS backends, with structured errors for the API
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import speech_recognition as sr
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds a recognition or synthesis call may take, hedges included
+DEFAULT_DEADLINES = {'stt': "8", 'tts': "10"}
+
+
+class UpstreamError(Exception):
+    """
+    Structured failure of a speech engine
+
+    Attributes:
+        service: "stt" or "tts"
+        code: deadline_exceeded, circuit_open or upstream_failed
+        backend: Engine name (google, gtts, ...)
+        message: Human-readable description
+        retry_after: Seconds until the engine is tried again (circuit_open only)
+    """
+
+    STATUS_CODES = {
+        'deadline_exceeded': 504,
+        'circuit_open': 503,
+        'upstream_failed': 502,
+    }
+
+    def __init__(self, service, code, backend, message, retry_after=None):
+        super().__init__(message)
+        self.service = service
+        self.code = code
+        self.backend = backend
+        self.message = message
+        self.retry_after = retry_after
+
+    @property
+    def status_code(self):
+        """HTTP status for this failure"""
+        return self.STATUS_CODES.get(self.code, 502)
+
+    def to_dict(self):
+        error = {
+            'code': self.code,
+            'service': self.service,
+            'backend': self.backend,
+            'message': self.message,
+        }
+        if self.retry_after is not None:
+            error['retry_after'] = self.retry_after
+        return error
+
+
+class LatencyTracker:
+    """Recent successful call latencies, for percentile-based hedging delays"""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        """Latency at the given fraction (e.g. 0.95), or None without samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class CircuitBreaker:
+    """
+    Stops calling an engine that keeps failing
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast for reset_timeout seconds. Then one trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go to the engine now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def retry_after(self):
+        """Seconds until a trial call is allowed (0 when not open)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self.clock() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit opened after {self._failures} failures")
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+                self._trial_running = False
+
+    def record_cancelled(self):
+        """A call was abandoned before the engine answered (counts neither way)"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                # Let the next call be the trial instead of blocking for good
+                self._trial_running = False
+
+
+class UpstreamGuard:
+    """
+    Deadline, hedging and circuit breaker for calls to one engine
+
+    Each call (recognizing one recording, synthesizing one text) must finish
+    within the deadline. Hedging works on the HTTP requests inside a call:
+    if a request has not answered after the engine's recent p95 request
+    latency, an identical second one is sent and whichever answers first
+    wins; the other is cancelled. Until enough latencies are known the
+    initial delay is used.
+    """
+
+    def __init__(self, service, backend_name, deadline=10.0, hedge=True, hedge_quantile=0.95,
+                 hedge_min_delay=0.05, hedge_initial_delay=1.0, min_samples=20, window=200,
+                 failure_threshold=5, reset_timeout=30.0):
+        """
+        Args:
+            service: "stt" or "tts" (for errors and metrics)
+            backend_name: Engine name (for errors and metrics)
+            deadline: Seconds a call may take in total, hedges included
+            hedge: Send a duplicate request when the first one is slow
+            hedge_quantile: Latency percentile after which to hedge
+            hedge_min_delay: Lower bound for the hedging delay in seconds
+            hedge_initial_delay: Hedging delay before min_samples latencies are known
+            min_samples: Latencies needed before the percentile is trusted
+            window: Number of recent latencies kept
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial call
+        """
+        self.service = service
+        self.backend_name = backend_name
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_initial_delay = hedge_initial_delay
+        self.min_samples = min_samples
+        self.latency = LatencyTracker(window)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    @classmethod
+    def from_env(cls, service, backend_name):
+        """
+        Build a guard configured by SAARTHI_<SERVICE>_DEADLINE, SAARTHI_HEDGE*
+        and SAARTHI_BREAKER_* environment variables
+        """
+        return cls(
+            service, backend_name,
+            deadline=float(os.environ.get(f"SAARTHI_{service.upper()}_DEADLINE", DEFAULT_DEADLINES[service])),
+            hedge=os.environ.get("SAARTHI_HEDGE", "1") != "0",
+            hedge_quantile=float(os.environ.get("SAARTHI_HEDGE_QUANTILE", "0.95")),
+            hedge_min_delay=float(os.environ.get("SAARTHI_HEDGE_MIN_DELAY_MS", "50")) / 1000,
+            hedge_initial_delay=float(os.environ.get("SAARTHI_HEDGE_INITIAL_DELAY_MS", "1000")) / 1000,
+            failure_threshold=int(os.environ.get("SAARTHI_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.environ.get("SAARTHI_BREAKER_RESET", "30")),
+        )
+
+    def hedge_delay(self):
+        """Seconds to wait for the first attempt before sending a duplicate"""
+        if len(self.latency) < self.min_samples:
+            return self.hedge_initial_delay
+        return max(self.hedge_min_delay, self.latency.percentile(self.hedge_quantile))
+
+    async def call(self, attempt, passthrough=()):
+        """
+        Run an engine call under the deadline and circuit breaker
+
+        Args:
+            attempt: Zero-argument function returning the call's awaitable
+            passthrough: Exception types that are valid answers (e.g. no
+                speech recognized); they are re-raised and count as success
+
+        Returns:
+            The call's result
+
+        Raises:
+            UpstreamError: The circuit is open, the deadline passed or the call failed
+        """
+        if not self.breaker.allow():
+            metrics.UPSTREAM_REJECTED.inc(self.service, self.backend_name)
+            raise UpstreamError(
+                self.service, 'circuit_open', self.backend_name,
+                f"{self.backend_name} is unavailable after repeated failures",
+                retry_after=round(self.breaker.retry_after(), 1)
+            )
+
+        try:
+            async with asyncio.timeout(self.deadline):
+                result = await attempt()
+        except passthrough:
+            self.breaker.record_success()
+            raise
+        except asyncio.CancelledError:
+            # The caller went away (client disconnect, hedge loser, ...)
+            self.breaker.record_cancelled()
+            raise
+        except TimeoutError:
+            self.breaker.record_failure()
+            raise UpstreamError(
+                self.service, 'deadline_exceeded', self.backend_name,
+                f"{self.backend_name} did not answer within {self.deadline:g}s"
+            )
+        except Exception as e:
+            self.breaker.record_failure()
+            raise UpstreamError(self.service, 'upstream_failed', self.backend_name, str(e)) from e
+
+        self.breaker.record_success()
+        return result
+
+    async def hedged(self, send):
+        """
+        Send a request, plus a duplicate if it is slower than usual
+
+        Args:
+            send: Zero-argument function sending the request; called again
+                for the duplicate
+
+        Returns:
+            The response of whichever request succeeded first
+        """
+        if not self.hedge or self.breaker.state != CircuitBreaker.CLOSED:
+            return await self._timed(send)
+
+        tasks = [self._start(send)]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay())
+            if not done:
+                tasks.append(self._start(send))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            self._count_hedge(won=task is not tasks[0])
+                        return task.result()
+            if len(tasks) > 1:
+                self._count_hedge(won=False)
+            # Both failed; report the original request's error
+            raise tasks[0].exception()
+        finally:
+            # Cancelling the loser also releases its connection
+            for task in tasks:
+                task.cancel()
+
+    def _start(self, send):
+        task = asyncio.ensure_future(self._timed(send))
+        # The loser's error is of no interest once the other request answered
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return task
+
+    async def _timed(self, send):
+        started = time.perf_counter()
+        result = await send()
+        self.latency.record(time.perf_counter() - started)
+        return result
+
+    def _count_hedge(self, won):
+        metrics.UPSTREAM_HEDGES.inc(self.service, self.backend_name, 'won' if won else 'lost')
+
+
+class _GuardedBackend:
+    """
+    Wraps a backend; everything except the async call is delegated
+
+    The backend's HTTP requests are hedged through its hedge attribute.
+    """
+
+    def __init__(self, backend, guard):
+        self.backend = backend
+        self.guard = guard
+        backend.hedge = guard.hedged
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+class GuardedSTTBackend(_GuardedBackend):
+    """STT backend whose async recognition goes through an UpstreamGuard"""
+
+    async def recognize_async(self, audio_data, language='en'):
+        return await self.guard.call(
+            lambda: self.backend.recognize_async(audio_data, language),
+            passthrough=(sr.UnknownValueError,)
+        )
+
+
+class GuardedTTSBackend(_GuardedBackend):
+    """TTS backend whose async synthesis goes through an UpstreamGuard"""
+
+    async def synthesize_async(self, text, language='en'):
+        return await self.guard.call(lambda: self.backend.synthesize_async(text, language))
+
+
+def guard_backends(backends, service):
+    """
+    Wrap the online engines of a backend mapping in guards
+
+    Languages sharing an engine instance share its guard, so they also
+    share its latency history and circuit breaker.
+
+    Args:
+        backends: Dict of language code to STTBackend or TTSBackend
+        service: "stt" or "tts"
+
+    Returns:
+        (dict of language code to backend, list of UpstreamGuard)
+    """
+    wrapper = GuardedSTTBackend if service == 'stt' else GuardedTTSBackend
+    wrapped = {}
+    guarded = {}
+    for language, backend in backends.items():
+        if not getattr(backend, 'online', False):
+            guarded[id(backend)] = backend
+        elif id(backend) not in guarded:
+            guarded[id(backend)] = wrapper(backend, UpstreamGuard.from_env(service, backend.name))
+        wrapped[language] = guarded[id(backend)]
+    guards = [backend.guard for backend in guarded.values() if isinstance(backend, _GuardedBackend)]
+    return wrapped, guards
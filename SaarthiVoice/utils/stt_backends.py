@@ -0,0 +1,234 @@
+"""
+Speech-to-text backends for SaarthiAI
+Google Web Speech (online) and Vosk (offline, CPU) behind one interface
+"""
+
+import json
+import logging
+import os
+import threading
+
+import httpx
+import speech_recognition as sr
+from speech_recognition.recognizers.google import ENDPOINT as GOOGLE_STT_ENDPOINT
+from speech_recognition.recognizers.google import OutputParser, create_request_builder
+
+from utils.executors import run_in_stage
+
+logger = logging.getLogger(__name__)
+
+try:
+    import vosk
+except ImportError:  # Optional dependency, only needed for offline STT
+    vosk = None
+
+
+class STTBackend:
+    """
+    Base class for speech recognition engines
+
+    Backends raise sr.UnknownValueError when no speech was recognized and
+    sr.RequestError when the engine itself failed, so AudioHelper can report
+    errors the same way for every engine.
+    """
+
+    name = "base"
+    # Online engines get deadlines, hedging and a circuit breaker
+    online = False
+    # Sends an HTTP request with hedging (set by resilience.guard_backends)
+    hedge = None
+
+    def recognize(self, audio_data, language='en'):
+        """
+        Recognize speech in decoded audio
+
+        Args:
+            audio_data: speech_recognition AudioData
+            language: Language code (en, hi, te)
+
+        Returns:
+            Transcribed text string
+        """
+        raise NotImplementedError
+
+    async def recognize_async(self, audio_data, language='en'):
+        """
+        Recognize speech without blocking the event loop
+
+        Engines without a native async client run recognize() on the STT
+        stage pool.
+        """
+        return await run_in_stage("stt", self.recognize, audio_data, language)
+
+    def warm_up(self, languages):
+        """Load any models needed for the given languages"""
+
+
+class GoogleSTTBackend(STTBackend):
+    """Google Web Speech API through speech_recognition (needs network)"""
+
+    name = "google"
+    online = True
+
+    lang_map = {
+        'en': 'en-US',
+        'hi': 'hi-IN',
+        'te': 'te-IN'
+    }
+
+    def __init__(self, recognizer=None, endpoint=None, pool=None):
+        """
+        Args:
+            recognizer: Shared sr.Recognizer (a new one is created if None)
+            endpoint: Speech API URL; SAARTHI_GOOGLE_STT_URL or Google's by default
+            pool: UpstreamPool for recognize_async (None falls back to a thread)
+        """
+        self.recognizer = recognizer or sr.Recognizer()
+        self.endpoint = endpoint or os.environ.get("SAARTHI_GOOGLE_STT_URL")
+        self.pool = pool
+
+    def recognize(self, audio_data, language='en'):
+        google_lang = self.lang_map.get(language, 'en-US')
+        if self.endpoint:
+            return self.recognizer.recognize_google(audio_data, language=google_lang, endpoint=self.endpoint)
+        return self.recognizer.recognize_google(audio_data, language=google_lang)
+
+    async def recognize_async(self, audio_data, language='en'):
+        if self.pool is None:
+            return await super().recognize_async(audio_data, language)
+
+        # Same request and response handling as recognize_google, sent over
+        # a pooled keep-alive connection instead of a new one per call
+        builder = create_request_builder(
+            endpoint=self.endpoint or GOOGLE_STT_ENDPOINT,
+            language=self.lang_map.get(language, 'en-US')
+        )
+        # FLAC encoding runs the flac binary, so it stays off the event loop
+        flac_data = await run_in_stage("stt", builder.build_data, audio_data)
+
+        url = builder.build_url()
+        headers = builder.build_headers(audio_data)
+
+        async def send():
+            try:
+                response = await self.pool.client(url).post(url, content=flac_data, headers=headers)
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                raise sr.RequestError(f"recognition request failed: {e.response.status_code} {e.response.reason_phrase}")
+            except httpx.HTTPError as e:
+                raise sr.RequestError(f"recognition connection failed: {e!r}")
+            return response
+
+        response = await (self.hedge(send) if self.hedge else send())
+        return OutputParser(show_all=False, with_confidence=False).parse(response.text)
+
+
+class VoskSTTBackend(STTBackend):
+    """
+    Offline recognition with Vosk (Kaldi) models on the CPU
+
+    Models are loaded once per process and shared by all requests. The model
+    directory for a language comes from SAARTHI_VOSK_MODEL_<LANG>, or
+    defaults to the small Vosk model inside SAARTHI_VOSK_MODEL_DIR.
+    """
+
+    name = "vosk"
+
+    default_models = {
+        'en': 'vosk-model-small-en-us-0.15',
+        'hi': 'vosk-model-small-hi-0.22',
+        'te': 'vosk-model-small-te-0.42'
+    }
+
+    def __init__(self, model_dir=None, sample_rate=16000):
+        if vosk is None:
+            raise RuntimeError("Vosk is not installed; run 'pip install vosk' for offline STT")
+
+        vosk.SetLogLevel(-1)
+        self.model_dir = model_dir or os.environ.get("SAARTHI_VOSK_MODEL_DIR", "stt_models")
+        self.sample_rate = sample_rate
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model_path(self, language):
+        """Return the model directory for a language"""
+        override = os.environ.get(f"SAARTHI_VOSK_MODEL_{language.upper()}")
+        if override:
+            return override
+        return os.path.join(self.model_dir, self.default_models.get(language, self.default_models['en']))
+
+    def get_model(self, language):
+        """Load a language model on first use and keep it for the process lifetime"""
+        model = self._models.get(language)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(language)
+            if model is None:
+                path = self.model_path(language)
+                logger.info(f"Loading Vosk model for {language}: {path}")
+                model = vosk.Model(path)
+                self._models[language] = model
+        return model
+
+    def warm_up(self, languages):
+        for language in languages:
+            self.get_model(language)
+
+    def recognize(self, audio_data, language='en'):
+        try:
+            # Each request needs its own recognizer; the model is shared
+            recognizer = vosk.KaldiRecognizer(self.get_model(language), self.sample_rate)
+            recognizer.AcceptWaveform(
+                audio_data.get_raw_data(convert_rate=self.sample_rate, convert_width=2)
+            )
+            text = json.loads(recognizer.FinalResult()).get('text', '').strip()
+        except Exception as e:
+            raise sr.RequestError(f"Vosk recognition failed: {e}")
+
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+STT_BACKENDS = {
+    GoogleSTTBackend.name: GoogleSTTBackend,
+    VoskSTTBackend.name: VoskSTTBackend,
+}
+
+
+def create_stt_backends(languages=('en', 'hi', 'te'), recognizer=None, pool=None):
+    """
+    Build the STT backend for each language from the environment
+
+    SAARTHI_STT_BACKEND selects the default engine (google or vosk);
+    SAARTHI_STT_BACKEND_<LANG> overrides it for one language.
+    Backends of the same engine are shared between languages.
+
+    Args:
+        languages: Language codes to configure
+        recognizer: Shared sr.Recognizer for the Google backend
+        pool: UpstreamPool for async requests to online engines
+
+    Returns:
+        Dict mapping language code to STTBackend
+    """
+    default = os.environ.get("SAARTHI_STT_BACKEND", GoogleSTTBackend.name)
+    instances = {}
+    backends = {}
+
+    for language in languages:
+        name = os.environ.get(f"SAARTHI_STT_BACKEND_{language.upper()}", default)
+        if name not in STT_BACKENDS:
+            raise ValueError(f"Unknown STT backend '{name}' for language {language}")
+
+        if name not in instances:
+            if name == GoogleSTTBackend.name:
+                instances[name] = GoogleSTTBackend(recognizer, pool=pool)
+            else:
+                instances[name] = STT_BACKENDS[name]()
+        backends[language] = instances[name]
+        logger.info(f"STT backend for {language}: {name}")
+
+    return backends
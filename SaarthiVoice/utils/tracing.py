@@ -0,0 +1,397 @@
+"""
+Per-request tracing for SaarthiAI
+Records spans for each request, builds the Server-Timing header and writes
+finished traces to a local file in the OpenTelemetry (OTLP) JSON format
+
+Find one request's breakdown (trace ID from the X-Trace-Id header):
+    python -m utils.tracing traces/spans.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+List slow requests:
+    python -m utils.tracing traces/spans.jsonl --min-ms 10000
+"""
+
+import argparse
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from pathlib import Path
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "saarthiai"
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# W3C trace context header: version-traceid-parentid-flags
+TRACEPARENT_PATTERN = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}")
+
+_current_trace = contextvars.ContextVar("saarthi_trace", default=None)
+_current_span = contextvars.ContextVar("saarthi_span", default=None)
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'kind', 'attributes',
+                 'start_ns', 'end_ns', 'error')
+
+    def __init__(self, trace, name, parent_id=None, kind=SPAN_KIND_INTERNAL, attributes=None):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    @property
+    def duration_ms(self):
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, error=None):
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace.spans.append(self)
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    """
+    All spans recorded while handling one request
+
+    Spans may finish on stage pool threads; run_in_stage copies the
+    request's context into the worker, so they land in the same trace.
+    """
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.spans = []
+        # Summed stage durations in ms, in first-seen order, for Server-Timing
+        self.stages = {}
+
+    def add_stage_time(self, stage, duration_ms):
+        self.stages[stage] = self.stages.get(stage, 0.0) + duration_ms
+
+    def server_timing(self, total_ms=None):
+        """Format stage times as a Server-Timing header value"""
+        entries = [f"{stage};dur={duration:.1f}" for stage, duration in list(self.stages.items())]
+        if total_ms is not None:
+            entries.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(entries)
+
+    def to_otlp(self):
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in self.spans],
+                }],
+            }]
+        }
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class FileSpanExporter:
+    """
+    Appends finished traces to a JSON-lines file, one OTLP document per line
+
+    Writing happens on a background thread so requests only pay for a
+    queue put. The file is rotated to <name>.1 when it grows past max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024):
+        """
+        Args:
+            path: Output file
+            max_bytes: Size at which the file is rotated
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._writer_pid = None
+        self._lock = threading.Lock()
+
+    def export(self, trace):
+        self._ensure_writer()
+        self._queue.put(trace)
+
+    def _ensure_writer(self):
+        # The writer thread does not survive fork, so start one per process
+        if self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid != os.getpid():
+                self._writer = threading.Thread(target=self._run, name="saarthi-trace-export", daemon=True)
+                self._writer.start()
+                self._writer_pid = os.getpid()
+
+    def _run(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                return
+            try:
+                line = json.dumps(trace.to_otlp(), ensure_ascii=False, separators=(",", ":"))
+                self._rotate_if_needed()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except Exception as e:
+                logger.warning(f"Could not export trace {trace.trace_id}: {e}")
+
+    def _rotate_if_needed(self):
+        try:
+            if self.path.stat().st_size < self.max_bytes:
+                return
+        except FileNotFoundError:
+            return
+        os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+
+    def shutdown(self):
+        """Flush queued traces and stop the writer thread of this process"""
+        if self._writer_pid == os.getpid() and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+            self._writer_pid = None
+
+
+_exporter = None
+
+
+def configure(path, max_bytes=50 * 1024 * 1024):
+    """
+    Set where finished traces are written
+
+    Args:
+        path: JSON-lines output file, or None/"" to keep traces in memory only
+        max_bytes: Size at which the file is rotated
+    """
+    global _exporter
+    _exporter = FileSpanExporter(path, max_bytes) if path else None
+
+
+def shutdown():
+    if _exporter is not None:
+        _exporter.shutdown()
+
+
+def parse_traceparent(header):
+    """
+    Read trace and parent span IDs from a W3C traceparent header
+
+    Returns:
+        (trace_id, parent_span_id), or (None, None) if absent or invalid
+    """
+    match = TRACEPARENT_PATTERN.fullmatch((header or "").strip().lower())
+    if not match or match.group(1) == "0" * 32:
+        return None, None
+    return match.group(1), match.group(2)
+
+
+def start_trace(name, traceparent=None, attributes=None):
+    """
+    Begin a request trace and make it current
+
+    Args:
+        name: Root span name (e.g. "POST /ask")
+        traceparent: Incoming traceparent header to continue, if any
+        attributes: Root span attributes
+
+    Returns:
+        (trace, root span, context tokens for detach)
+    """
+    trace_id, parent_id = parse_traceparent(traceparent)
+    trace = Trace(trace_id)
+    root = Span(trace, name, parent_id=parent_id, kind=SPAN_KIND_SERVER, attributes=attributes)
+    tokens = (_current_trace.set(trace), _current_span.set(root))
+    return trace, root, tokens
+
+
+def detach(tokens):
+    """
+    Stop making a trace current in this context
+
+    Work already started (tasks, stage pool calls) keeps its own copy of
+    the context and still records into the trace.
+    """
+    _current_span.reset(tokens[1])
+    _current_trace.reset(tokens[0])
+
+
+def end_trace(root, error=None):
+    """Finish the root span and hand the trace to the exporter"""
+    root.end(error)
+    if _exporter is not None:
+        _exporter.export(root.trace)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def set_attribute(key, value):
+    """Set an attribute on the innermost active span (no-op outside a trace)"""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+
+class span:
+    """
+    Context manager recording a child span of the current span
+
+    Does nothing when no request trace is active, e.g. in scripts.
+
+    Usage:
+        with tracing.span("load_model", language="hi"):
+            ...
+    """
+
+    __slots__ = ('name', 'attributes', 'span', 'token')
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is not None:
+            self.span = Span(parent.trace, self.name, parent_id=parent.span_id, attributes=self.attributes)
+            self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.span is not None:
+            _current_span.reset(self.token)
+            self.span.end(exc)
+        return False
+
+
+class stage(span):
+    """
+    Span for a voice pipeline stage
+
+    Also records the stage in the /metrics latency histogram and in the
+    request's Server-Timing header.
+
+    Usage:
+        with tracing.stage("decode"):
+            pcm = decode(...)
+    """
+
+    __slots__ = ('timer',)
+
+    def __init__(self, name, **attributes):
+        super().__init__(name, **attributes)
+        self.timer = metrics.stage_timer(name)
+
+    def __enter__(self):
+        self.timer.__enter__()
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, traceback):
+        super().__exit__(exc_type, exc, traceback)
+        self.timer.__exit__(exc_type, exc, traceback)
+        if self.span is not None:
+            self.span.trace.add_stage_time(self.name, self.span.duration_ms)
+        return False
+
+
+def _load_traces(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+
+
+def _print_trace(spans):
+    """Print spans as an indented tree with offsets from the request start"""
+    children = {}
+    for item in spans:
+        children.setdefault(item.get("parentSpanId"), []).append(item)
+    ids = {item["spanId"] for item in spans}
+    roots = [item for item in spans if item.get("parentSpanId") not in ids]
+    start = min(int(item["startTimeUnixNano"]) for item in spans)
+
+    def show(item, depth):
+        offset = (int(item["startTimeUnixNano"]) - start) / 1e6
+        duration = (int(item["endTimeUnixNano"]) - int(item["startTimeUnixNano"])) / 1e6
+        attributes = " ".join(
+            f"{attribute['key']}={next(iter(attribute['value'].values()))}" for attribute in item["attributes"]
+        )
+        error = f"  ERROR {item['status'].get('message')}" if item["status"]["code"] == STATUS_ERROR else ""
+        print(f"{offset:>9.1f}ms {duration:>9.1f}ms  {'  ' * depth}{item['name']}  {attributes}{error}")
+        for child in sorted(children.get(item["spanId"], []), key=lambda c: int(c["startTimeUnixNano"])):
+            show(child, depth + 1)
+
+    print(f"trace {spans[0]['traceId']}")
+    for root in roots:
+        show(root, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show request traces written by SaarthiAI")
+    parser.add_argument("path", help="Trace file (SAARTHI_TRACE_FILE)")
+    parser.add_argument("--trace", help="Trace ID to show (from the X-Trace-Id response header)")
+    parser.add_argument("--min-ms", type=float, default=0.0, help="Only show requests at least this slow")
+    args = parser.parse_args()
+
+    for spans in _load_traces(args.path):
+        if args.trace and spans[0]["traceId"] != args.trace:
+            continue
+        server = [item for item in spans if item["kind"] == SPAN_KIND_SERVER] or spans
+        duration = max((int(item["endTimeUnixNano"]) - int(item["startTimeUnixNano"])) / 1e6 for item in server)
+        if duration < args.min_ms:
+            continue
+        _print_trace(spans)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+Text-to-speech backends for SaarthiAI
+gTTS (online), Piper and espeak-ng (offline, CPU) behind one interface
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import wave
+from io import BytesIO
+
+import httpx
+from gtts import gTTS, gTTSError
+
+from utils.audio_formats import MEDIA_TYPES, transcode
+from utils.executors import run_in_stage
+
+logger = logging.getLogger(__name__)
+
+try:
+    from piper import PiperVoice
+except ImportError:  # Optional dependency, only needed for Piper voices
+    try:
+        from piper.voice import PiperVoice
+    except ImportError:
+        PiperVoice = None
+
+class TTSBackend:
+    """
+    Base class for speech synthesis engines
+
+    Backends return audio already encoded in their output format, and
+    describe the settings that change the audio so the TTS cache can key
+    on them.
+    """
+
+    name = "base"
+    native_format = "wav"
+    # Online engines get deadlines, hedging and a circuit breaker
+    online = False
+    # Sends an HTTP request with hedging (set by resilience.guard_backends)
+    hedge = None
+
+    def __init__(self, output_format='mp3'):
+        if output_format not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported TTS output format: {output_format}")
+        self.output_format = output_format
+
+    @property
+    def media_type(self):
+        return MEDIA_TYPES[self.output_format]
+
+    def voice_settings(self, language):
+        """Settings that affect rendered audio (used in cache keys)"""
+        return {'engine': self.name, 'format': self.output_format}
+
+    def synthesize(self, text, language='en'):
+        """
+        Render text to encoded audio
+
+        Args:
+            text: Text to speak
+            language: Language code (en, hi, te)
+
+        Returns:
+            Audio bytes in self.output_format
+        """
+        audio_bytes = self._render(text, language)
+        if self.native_format != self.output_format:
+            audio_bytes = transcode(audio_bytes, self.output_format, self.native_format)
+        return audio_bytes
+
+    async def synthesize_async(self, text, language='en'):
+        """
+        Render text to encoded audio without blocking the event loop
+
+        Engines without a native async client run synthesize() on the TTS
+        stage pool.
+        """
+        return await run_in_stage("tts", self.synthesize, text, language)
+
+    def _render(self, text, language):
+        """Render text in the engine's native format"""
+        raise NotImplementedError
+
+    def warm_up(self, languages):
+        """Load any voices needed for the given languages"""
+
+
+# Google Translate's speech RPC, sent to its batchexecute endpoint
+GTTS_RPC = "jQ1olc"
+GTTS_URL = "https://translate.google.com/_/TranslateWebserverUi/data/batchexecute"
+
+
+def gtts_audio(body):
+    """
+    Decode the audio in a batchexecute response
+
+    After the )]}' guard the response has one JSON array per line (real
+    responses put a length line before each); the speech RPC's entry holds a
+    JSON-encoded list whose first item is the base64 MP3.
+
+    Args:
+        body: Response text
+
+    Returns:
+        MP3 bytes
+
+    Raises:
+        gTTSError: The response holds no audio
+    """
+    audio = []
+    for line in body.splitlines():
+        if not line.startswith('['):
+            continue
+        try:
+            entries = json.loads(line)
+        except ValueError:
+            continue
+        for entry in entries:
+            if isinstance(entry, list) and entry[:2] == ['wrb.fr', GTTS_RPC]:
+                payload = json.loads(entry[2]) if isinstance(entry[2], str) else None
+                if not payload:
+                    raise gTTSError("No audio stream in TTS response")
+                audio.append(base64.b64decode(payload[0]))
+    if not audio:
+        raise gTTSError("No audio stream in TTS response")
+    return b"".join(audio)
+
+
+def _gtts_error(e):
+    """gTTSError for a failed httpx request"""
+    if isinstance(e, httpx.HTTPStatusError):
+        return gTTSError(f"TTS request failed: {e.response.status_code} {e.response.reason_phrase}")
+    return gTTSError(f"TTS connection failed: {e!r}")
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS through gTTS (needs network)"""
+
+    name = "gtts"
+    native_format = "mp3"
+    online = True
+
+    lang_map = {
+        'en': 'en',
+        'hi': 'hi',
+        'te': 'te'
+    }
+
+    def __init__(self, output_format='mp3', endpoint=None, pool=None):
+        """
+        Args:
+            output_format: mp3, opus or wav
+            endpoint: batchexecute URL; SAARTHI_GTTS_URL or Google's by default
+            pool: UpstreamPool for synthesize_async (None falls back to a thread)
+        """
+        super().__init__(output_format)
+        self.endpoint = endpoint or os.environ.get("SAARTHI_GTTS_URL")
+        self.pool = pool
+
+    def voice_settings(self, language):
+        settings = super().voice_settings(language)
+        settings['slow'] = False
+        return settings
+
+    def _request_bodies(self, text, language):
+        """batchexecute request bodies for the parts gTTS splits the text into"""
+        return gTTS(text=text, lang=self.lang_map.get(language, 'en'), slow=False).get_bodies()
+
+    def _render(self, text, language):
+        if not self.endpoint:
+            tts = gTTS(text=text, lang=self.lang_map.get(language, 'en'), slow=False)
+            audio_buffer = BytesIO()
+            tts.write_to_fp(audio_buffer)
+            return audio_buffer.getvalue()
+
+        parts = []
+        for body in self._request_bodies(text, language):
+            try:
+                response = httpx.post(self.endpoint, content=body, headers=gTTS.GOOGLE_TTS_HEADERS, timeout=10)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                raise _gtts_error(e)
+            parts.append(gtts_audio(response.text))
+        return b"".join(parts)
+
+    async def synthesize_async(self, text, language='en'):
+        if self.pool is None:
+            return await super().synthesize_async(text, language)
+
+        # gTTS splits long text into parts; fetch them all at once over the
+        # pooled connections instead of one after another on new ones
+        fetches = [asyncio.ensure_future(self._fetch(body)) for body in self._request_bodies(text, language)]
+        try:
+            parts = await asyncio.gather(*fetches)
+        finally:
+            # One failed part fails the text; stop the others holding connections
+            for fetch in fetches:
+                fetch.cancel()
+        audio_bytes = b"".join(parts)
+
+        if self.native_format != self.output_format:
+            audio_bytes = await run_in_stage("tts", transcode, audio_bytes, self.output_format, self.native_format)
+        return audio_bytes
+
+    async def _fetch(self, body):
+        """Send one batchexecute request and decode the audio in its response"""
+        url = self.endpoint or GTTS_URL
+
+        async def send():
+            try:
+                response = await self.pool.client(url).post(url, content=body, headers=gTTS.GOOGLE_TTS_HEADERS)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                raise _gtts_error(e)
+            return response
+
+        response = await (self.hedge(send) if self.hedge else send())
+        return gtts_audio(response.text)
+
+
+class PiperTTSBackend(TTSBackend):
+    """
+    Offline neural voices with Piper (ONNX) on the CPU
+
+    Voices are loaded once per process and reused for every request. The
+    voice model for a language comes from SAARTHI_PIPER_VOICE_<LANG>, or
+    defaults to a medium voice inside SAARTHI_PIPER_VOICE_DIR.
+    """
+
+    name = "piper"
+
+    default_voices = {
+        'en': 'en_US-lessac-medium.onnx',
+        'hi': 'hi_IN-pratham-medium.onnx',
+        'te': 'te_IN-maya-medium.onnx'
+    }
+
+    def __init__(self, output_format='mp3', voice_dir=None):
+        if PiperVoice is None:
+            raise RuntimeError("Piper is not installed; run 'pip install piper-tts' for local TTS")
+
+        super().__init__(output_format)
+        self.voice_dir = voice_dir or os.environ.get("SAARTHI_PIPER_VOICE_DIR", "tts_voices")
+        self._voices = {}
+        self._lock = threading.Lock()
+
+    def voice_path(self, language):
+        """Return the voice model file for a language"""
+        override = os.environ.get(f"SAARTHI_PIPER_VOICE_{language.upper()}")
+        if override:
+            return override
+        return os.path.join(self.voice_dir, self.default_voices.get(language, self.default_voices['en']))
+
+    def get_voice(self, language):
+        """Load a voice on first use and keep it for the process lifetime"""
+        voice = self._voices.get(language)
+        if voice is not None:
+            return voice
+
+        with self._lock:
+            voice = self._voices.get(language)
+            if voice is None:
+                path = self.voice_path(language)
+                logger.info(f"Loading Piper voice for {language}: {path}")
+                voice = PiperVoice.load(path)
+                self._voices[language] = voice
+        return voice
+
+    def voice_settings(self, language):
+        settings = super().voice_settings(language)
+        settings['voice'] = os.path.basename(self.voice_path(language))
+        return settings
+
+    def warm_up(self, languages):
+        for language in languages:
+            self.get_voice(language)
+
+    def _render(self, text, language):
+        voice = self.get_voice(language)
+        wav_buffer = BytesIO()
+        with wave.open(wav_buffer, 'wb') as wav_file:
+            # piper-tts 1.3 renamed synthesize() to synthesize_wav()
+            if hasattr(voice, 'synthesize_wav'):
+                voice.synthesize_wav(text, wav_file)
+            else:
+                voice.synthesize(text, wav_file)
+        return wav_buffer.getvalue()
+
+
+class EspeakTTSBackend(TTSBackend):
+    """
+    Offline formant synthesis with the espeak-ng command line tool
+
+    Lower quality than Piper, but tiny and available as a system package.
+    """
+
+    name = "espeak"
+
+    voice_map = {
+        'en': 'en',
+        'hi': 'hi',
+        'te': 'te'
+    }
+
+    def __init__(self, output_format='mp3', binary=None):
+        super().__init__(output_format)
+        self.binary = binary or shutil.which('espeak-ng') or shutil.which('espeak')
+        if not self.binary:
+            raise RuntimeError("espeak-ng is not installed")
+        self.speed = int(os.environ.get("SAARTHI_ESPEAK_SPEED", "150"))
+
+    def voice_settings(self, language):
+        settings = super().voice_settings(language)
+        settings['voice'] = self.voice_map.get(language, 'en')
+        settings['speed'] = self.speed
+        return settings
+
+    def _render(self, text, language):
+        command = [
+            self.binary, '--stdout',
+            '-v', self.voice_map.get(language, 'en'),
+            '-s', str(self.speed),
+            '--stdin'
+        ]
+        result = subprocess.run(command, input=text.encode('utf-8'), capture_output=True)
+        if result.returncode != 0:
+            error = result.stderr.decode('utf-8', errors='replace').strip()
+            raise RuntimeError(f"espeak-ng failed: {error}")
+        return result.stdout
+
+
+TTS_BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    PiperTTSBackend.name: PiperTTSBackend,
+    EspeakTTSBackend.name: EspeakTTSBackend,
+}
+
+
+def create_tts_backends(languages=('en', 'hi', 'te'), output_format=None, pool=None):
+    """
+    Build the TTS backend for each language from the environment
+
+    SAARTHI_TTS_BACKEND selects the default engine (gtts, piper or espeak);
+    SAARTHI_TTS_BACKEND_<LANG> overrides it for one language, and
+    SAARTHI_TTS_FORMAT sets the output format (mp3, opus or wav) for all of them.
+
+    Args:
+        languages: Language codes to configure
+        output_format: Output format, SAARTHI_TTS_FORMAT by default
+        pool: UpstreamPool for async requests to online engines
+
+    Returns:
+        Dict mapping language code to TTSBackend
+    """
+    output_format = output_format or os.environ.get("SAARTHI_TTS_FORMAT", "mp3")
+    default = os.environ.get("SAARTHI_TTS_BACKEND", GTTSBackend.name)
+    instances = {}
+    backends = {}
+
+    for language in languages:
+        name = os.environ.get(f"SAARTHI_TTS_BACKEND_{language.upper()}", default)
+        if name not in TTS_BACKENDS:
+            raise ValueError(f"Unknown TTS backend '{name}' for language {language}")
+
+        if name not in instances:
+            if name == GTTSBackend.name:
+                instances[name] = GTTSBackend(output_format=output_format, pool=pool)
+            else:
+                instances[name] = TTS_BACKENDS[name](output_format=output_format)
+        backends[language] = instances[name]
+        logger.info(f"TTS backend for {language}: {name} ({output_format})")
+
+    return backends
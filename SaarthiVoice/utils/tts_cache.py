@@ -0,0 +1,289 @@
+"""
+Content-addressed audio cache for SaarthiAI
+Keeps rendered speech in a size-limited memory LRU backed by a disk tier
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from utils.metrics import TTS_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Disk entries are named <key>.<extension>; temp files have more dots
+DISK_ENTRY_PATTERN = re.compile(r"[0-9a-f]{64}\.[a-z0-9]+")
+
+
+class TTSCache:
+    """
+    Two-tier cache for synthesized audio
+
+    Entries are keyed by a hash of (text, language, voice settings), so the
+    same guidance text always maps to the same entry, and by the file
+    extension of their encoding, so a lookup for one format never returns
+    audio encoded as another. The memory tier is an
+    LRU bounded in bytes; the disk tier stores one file per entry and evicts
+    the least recently used files when it grows past its byte limit.
+
+    With a SharedAudioStore the store replaces the per-process memory LRU,
+    so worker processes share one copy of the audio and hits are returned
+    as views into it rather than as copies.
+    """
+
+    def __init__(self, cache_dir="tts_cache", memory_limit=32 * 1024 * 1024,
+                 disk_limit=256 * 1024 * 1024, extension="mp3", shared_store=None):
+        """
+        Args:
+            cache_dir: Directory for the disk tier (None disables it)
+            memory_limit: Maximum bytes held in memory
+            disk_limit: Maximum bytes held on disk
+            extension: File extension of entries stored or looked up without one
+            shared_store: Optional SharedAudioStore used instead of the memory LRU
+        """
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.extension = extension
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.shared_store = shared_store
+
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk_size = 0
+        self._lock = threading.Lock()
+
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_size = sum(path.stat().st_size for path in self._disk_entries())
+
+    @staticmethod
+    def make_key(text, language, **voice):
+        """
+        Build the content-addressed key for a piece of speech
+
+        Args:
+            text: Text being synthesized
+            language: Language code (en, hi, te)
+            **voice: Voice settings that change the rendered audio
+
+        Returns:
+            Hex digest identifying the audio
+        """
+        digest = hashlib.sha256()
+        digest.update(language.encode("utf-8"))
+        for name in sorted(voice):
+            digest.update(f"\0{name}={voice[name]}".encode("utf-8"))
+        digest.update(b"\0\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key, extension=None):
+        """
+        Look up audio bytes, checking memory before disk
+
+        Args:
+            key: Key from make_key
+            extension: File extension of the wanted encoding (mp3, ogg, wav)
+
+        Returns:
+            Audio bytes (a read-only memoryview when served from the shared
+            store), or None on a miss
+        """
+        extension = extension or self.extension
+        entry = self._entry(key, extension)
+        if self.shared_store is not None:
+            data = self.shared_store.get(entry)
+            if data is not None:
+                with self._lock:
+                    self.stats["memory_hits"] += 1
+                TTS_CACHE_REQUESTS.inc("memory_hit")
+                return data
+        else:
+            with self._lock:
+                data = self._memory.get(entry)
+                if data is not None:
+                    self._memory.move_to_end(entry)
+                    self.stats["memory_hits"] += 1
+                    TTS_CACHE_REQUESTS.inc("memory_hit")
+                    return data
+
+        data = self._read_disk(key, extension)
+        if data is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            TTS_CACHE_REQUESTS.inc("miss")
+            return None
+
+        with self._lock:
+            self.stats["disk_hits"] += 1
+        self._remember(entry, data)
+        TTS_CACHE_REQUESTS.inc("disk_hit")
+        return data
+
+    def contains(self, key, extension=None):
+        """Whether audio is stored under a key and extension (not counted as a lookup)"""
+        extension = extension or self.extension
+        entry = self._entry(key, extension)
+        if self.shared_store is not None:
+            if self.shared_store.get(entry) is not None:
+                return True
+        else:
+            with self._lock:
+                if entry in self._memory:
+                    return True
+        return self.cache_dir is not None and self._path(key, extension).exists()
+
+    def put(self, key, data, extension=None):
+        """Store audio bytes in both tiers, under the extension of their encoding"""
+        extension = extension or self.extension
+        self._remember(self._entry(key, extension), data)
+        self._write_disk(key, extension, data)
+
+    def preload(self):
+        """
+        Fill the memory tier (or shared store) with the most recently used
+        disk entries
+
+        Meant for the server master before it forks workers, which then
+        share the loaded audio instead of each reading it.
+
+        Returns:
+            Number of entries loaded
+        """
+        if not self.cache_dir:
+            return 0
+
+        entries = []
+        for path in self._disk_entries():
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        entries.sort(reverse=True)
+
+        if self.shared_store is not None:
+            total, limit = self.shared_store.size, self.shared_store.max_bytes
+        else:
+            total, limit = self._memory_size, self.memory_limit
+
+        loaded = []
+        for _, path in entries:
+            if total >= limit:
+                break
+            try:
+                data = path.read_bytes()
+            except OSError:
+                continue
+            if total + len(data) <= limit:
+                key, extension = path.name.split(".")
+                loaded.append((self._entry(key, extension), data))
+                total += len(data)
+
+        # Oldest first, so the LRU order matches the disk access times
+        for entry, data in reversed(loaded):
+            self._remember(entry, data)
+        logger.info(f"Preloaded {len(loaded)} cached audio entries ({total} bytes)")
+        return len(loaded)
+
+    @staticmethod
+    def _entry(key, extension):
+        """Hex key of one encoding of the audio in the fast tier"""
+        return hashlib.sha256(f"{key}.{extension}".encode("ascii")).hexdigest()
+
+    def _remember(self, entry, data):
+        """Keep audio in the fast tier: the shared store, or this process's LRU"""
+        if self.shared_store is not None:
+            self.shared_store.put(entry, data)
+        else:
+            with self._lock:
+                self._store_memory(entry, data)
+
+    def _store_memory(self, key, data):
+        """Insert into the memory LRU and evict down to the byte limit (lock held)"""
+        if len(data) > self.memory_limit:
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+
+        self._memory[key] = data
+        self._memory_size += len(data)
+
+        while self._memory_size > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _path(self, key, extension):
+        return self.cache_dir / f"{key}.{extension}"
+
+    def _disk_entries(self):
+        return (path for path in self.cache_dir.iterdir() if DISK_ENTRY_PATTERN.fullmatch(path.name))
+
+    def _read_disk(self, key, extension):
+        if not self.cache_dir:
+            return None
+
+        path = self._path(key, extension)
+        try:
+            data = path.read_bytes()
+            # Touch the file so disk eviction follows recent use
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read cached audio {path}: {e}")
+            return None
+
+    def _write_disk(self, key, extension, data):
+        if not self.cache_dir or len(data) > self.disk_limit:
+            return
+
+        path = self._path(key, extension)
+        if path.exists():
+            return
+
+        # Write to a temp name and rename so readers never see partial files
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cached audio {path}: {e}")
+            temp_path.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._disk_size += len(data)
+            over_limit = self._disk_size > self.disk_limit
+        if over_limit:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove least recently used files until the disk tier fits its limit"""
+        entries = []
+        for path in self._disk_entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.disk_limit:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+        with self._lock:
+            self._disk_size = total
+        logger.info(f"Evicted TTS disk cache down to {total} bytes")
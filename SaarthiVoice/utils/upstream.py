@@ -0,0 +1,120 @@
+"""
+Pooled HTTP clients for SaarthiAI's speech upstreams
+Async keep-alive connections shared by every request of a worker process,
+with per-host limits, HTTP/2 where available and configurable timeouts
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # Optional dependency (httpx[http2]), HTTP/1.1 is used without it
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamPool:
+    """
+    One async HTTP client per upstream host
+
+    Each host gets its own connection pool, so the connection limit applies
+    per host and a slow TTS upstream cannot use up the connections of the
+    STT upstream. Connections are kept alive between requests, which saves
+    the TCP and TLS handshakes on every call, and HTTP/2 is negotiated with
+    servers that support it when the h2 package is installed.
+
+    Clients are created on first use inside the running event loop, and
+    every event loop has its own: a loop that runs for a while next to the
+    server's (a sync helper's asyncio.run) never touches the server's
+    connections. Such a loop closes its clients with aclose() before it
+    ends. A forked worker starts without clients.
+    """
+
+    def __init__(self, max_connections=32, max_keepalive=16, keepalive_expiry=30.0,
+                 connect_timeout=3.0, read_timeout=10.0, write_timeout=10.0,
+                 pool_timeout=5.0, http2=True):
+        """
+        Args:
+            max_connections: Open connections allowed per host
+            max_keepalive: Idle connections kept open per host
+            keepalive_expiry: Seconds an idle connection is kept
+            connect_timeout: Seconds to establish a connection (incl. TLS)
+            read_timeout: Seconds to wait for response data
+            write_timeout: Seconds to send request data
+            pool_timeout: Seconds to wait for a free connection
+            http2: Negotiate HTTP/2 when the h2 package is installed
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout, read=read_timeout, write=write_timeout, pool=pool_timeout
+        )
+        self.http2 = http2 and h2 is not None
+        # Event loop -> {(scheme, host): client}
+        self._clients = weakref.WeakKeyDictionary()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a pool configured by the SAARTHI_UPSTREAM_* environment variables"""
+        return cls(
+            max_connections=int(os.environ.get("SAARTHI_UPSTREAM_MAX_CONNECTIONS", "32")),
+            max_keepalive=int(os.environ.get("SAARTHI_UPSTREAM_MAX_KEEPALIVE", "16")),
+            keepalive_expiry=float(os.environ.get("SAARTHI_UPSTREAM_KEEPALIVE_EXPIRY", "30")),
+            connect_timeout=float(os.environ.get("SAARTHI_UPSTREAM_CONNECT_TIMEOUT", "3")),
+            read_timeout=float(os.environ.get("SAARTHI_UPSTREAM_READ_TIMEOUT", "10")),
+            write_timeout=float(os.environ.get("SAARTHI_UPSTREAM_WRITE_TIMEOUT", "10")),
+            pool_timeout=float(os.environ.get("SAARTHI_UPSTREAM_POOL_TIMEOUT", "5")),
+            http2=os.environ.get("SAARTHI_UPSTREAM_HTTP2", "1") != "0",
+        )
+
+    def client(self, url):
+        """
+        Shared client for the host of a URL
+
+        Must be called from the event loop the client will be used on.
+
+        Args:
+            url: Any URL on the upstream host
+
+        Returns:
+            httpx.AsyncClient
+        """
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.netloc)
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the parent's connections are neither usable nor ours to close
+                self._clients = weakref.WeakKeyDictionary()
+                self._pid = os.getpid()
+
+            clients = self._clients.setdefault(loop, {})
+            client = clients.get(origin)
+            if client is None:
+                client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+                clients[origin] = client
+                logger.info(f"Opened connection pool for {parts.scheme}://{parts.netloc} (http2: {self.http2})")
+            return client
+
+    async def aclose(self):
+        """Close the connections opened from the running event loop"""
+        with self._lock:
+            clients = {}
+            if self._pid == os.getpid():
+                clients = self._clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()